@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import concurrent.futures
+import importlib.util
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from ruamel.yaml import YAML
+
+from src.machine import aot
+from src.machine.machine import simulation
+from src.machine.trace import StreamTrace
+from src.translator.main import translate
+
+GOLDEN_DIR = Path(__file__).parent.parent / "golden"
+
+CONFIGS = ("interpreter", "interpreter+trace", "closure", "jit", "aot", "batch")
+BASELINE = "interpreter"
+LIMIT = 100_000
+
+# a run of a program on one input: output, instruction and tick counters, final memory (None if the
+# configuration doesn't expose it) and the error it failed with, if any
+Result = tuple[str, int, int, tuple[int, ...] | None, str | None]
+
+
+def available_configs() -> tuple[str, ...]:
+    """Configurations that can run here, the batch engine needs NumPy."""
+    return tuple(config for config in CONFIGS if config != "batch" or importlib.util.find_spec("numpy") is not None)
+
+
+def run_simulation(image: list[str], input_tokens: list[str], limit: int, engine: str, trace_dir: str | None) -> Result:
+    memory = list(image)
+    trace = StreamTrace(str(Path(trace_dir) / "trace")) if trace_dir is not None else None
+    try:
+        output, instr_counter, ticks = simulation(memory, list(input_tokens), limit, engine, trace=trace)
+    finally:
+        if trace is not None:
+            trace.close()
+    return output, instr_counter, ticks, tuple(int(word, 16) for word in memory), None
+
+
+def run_config(config: str, image: list[str], inputs: list[list[str]], limit: int) -> tuple[list[Result], float]:
+    """Runs `image` on every input in configuration `config`, returns the results and the time taken."""
+    logging.getLogger().setLevel(logging.ERROR)
+    start = time.perf_counter()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if config == "batch":
+            from src.machine.batch import BatchMachine
+
+            machine = BatchMachine(image, inputs, limit)
+            machine.run()
+            memories = [tuple(int(word) for word in lane) for lane in machine.memory]
+            batch_results: list[Result] = [
+                (*result, memory, None) for result, memory in zip(machine.results(), memories)
+            ]
+            return batch_results, time.perf_counter() - start
+
+        module = None
+        if config == "aot":
+            module_file = str(Path(tmp_dir) / "image.py")
+            aot.compile_image(image, module_file)
+            module = aot.load_module(module_file)
+
+        results: list[Result] = []
+        for input_tokens in inputs:
+            try:
+                if module is not None:
+                    results.append((*module.run(list(input_tokens), limit), None, None))
+                else:
+                    engine, _, traced = config.partition("+")
+                    results.append(run_simulation(image, input_tokens, limit, engine, tmp_dir if traced else None))
+            except Exception as e:
+                results.append(("", 0, 0, None, f"{type(e).__name__}: {e}"))
+
+    return results, time.perf_counter() - start
+
+
+def differences(expected: Result, actual: Result) -> list[str]:
+    fields = ("output", "instr_counter", "ticks", "memory", "error")
+    found = []
+    for field, expected_value, actual_value in zip(fields, expected, actual):
+        if field == "memory" and (expected_value is None or actual_value is None):
+            continue
+        if expected_value != actual_value:
+            found.append(field)
+    return found
+
+
+def check(programs: dict[str, tuple[str, list[list[str]]]], configs=None, limit=LIMIT, workers=None) -> dict:
+    """Translates every program once and runs it on its inputs in every configuration, a process
+    per (program, configuration) pair. Returns the mismatches against the interpreter, as
+    `(program, input index, configuration, fields)`, and instructions per second of each configuration."""
+    configs = configs or available_configs()
+    assert BASELINE in configs, f"The {BASELINE} configuration is the baseline"
+    images = {name: translate(source)[0] for name, (source, _) in programs.items()}
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        futures = {
+            (name, config): executor.submit(run_config, config, images[name], programs[name][1], limit)
+            for name in programs
+            for config in configs
+        }
+        runs = {key: future.result() for key, future in futures.items()}
+
+    mismatches = []
+    instructions = dict.fromkeys(configs, 0)
+    seconds = dict.fromkeys(configs, 0.0)
+
+    for (name, config), (results, elapsed) in runs.items():
+        baseline = runs[name, BASELINE][0]
+        for index, (expected, actual) in enumerate(zip(baseline, results)):
+            fields = differences(expected, actual)
+            if fields:
+                mismatches.append((name, index, config, fields))
+        instructions[config] += sum(result[1] for result in results)
+        seconds[config] += elapsed
+
+    throughput = {config: instructions[config] / seconds[config] if seconds[config] else 0.0 for config in configs}
+    return {"mismatches": mismatches, "throughput": throughput}
+
+
+def golden_programs() -> dict[str, tuple[str, list[list[str]]]]:
+    programs = {}
+    yaml = YAML(typ="safe")
+    for path in sorted(GOLDEN_DIR.glob("*.yml")):
+        with open(path, encoding="utf-8") as f:
+            golden = yaml.load(f)
+        text = golden["input"]
+        programs[path.stem] = (golden["source"], [[*text, "\0"], list(text[:1]), []])
+    return programs
+
+
+class ProgramGenerator:
+    """Random well-formed programs: globals, a function with locals, a tail-recursive function,
+    bounded loops, branches, `&` in conditions and values, input, string arrays and every kind of
+    output. Loops count a fresh variable up to a literal, `&` can only stop them earlier, so programs
+    terminate unless an input makes them wait."""
+
+    def __init__(self, seed: int):
+        self.random = random.Random(seed)
+        self.variables = [f"v{i}" for i in range(4)]
+        self.counters = 0
+
+    def atom(self) -> str:
+        return self.random.choice(self.variables) if self.random.random() < 0.6 else str(self.random.randint(0, 300))
+
+    def comparison(self) -> str:
+        comparison = self.random.choice(["=", "!="])
+        return f"({comparison} {self.random.choice(self.variables)} {self.random.randint(0, 300)})"
+
+    def condition(self) -> str:
+        """A comparison, a variable or `&` of two of them."""
+        kind = self.random.randint(0, 3)
+        if kind == 0:
+            return self.random.choice(self.variables)
+        if kind == 1:
+            return f"(& {self.comparison()} {self.random.choice([self.comparison(), *self.variables])})"
+        return self.comparison()
+
+    def value(self) -> str:
+        kind = self.random.randint(0, 6)
+        if kind == 0:
+            return self.atom()
+        if kind == 1:
+            return "(read_char)"
+        if kind == 2:
+            return f"(add3 {self.atom()} {self.atom()})"
+        if kind == 3:
+            return f"(sum_to {self.random.randint(0, 15)} 0)"
+        if kind == 4:
+            return f"(% {self.random.choice(self.variables)} {self.random.randint(1, 50)})"
+        if kind == 5:
+            return f"(& {self.condition()} {self.condition()})"
+        return f"({self.random.choice('+-')} {self.random.choice(self.variables)} {self.atom()})"
+
+    def statement(self, depth: int) -> list[str]:
+        variable = self.random.choice(self.variables)
+        kind = self.random.randint(0, 7 if depth < 2 else 5)
+
+        if kind == 0:
+            return [f"(set t (% {variable} 26))", "(set t (+ t 65))", "(print_char t)"]
+        if kind == 1:
+            return [f"(print_int {variable})"]
+        if kind == 2:
+            return [f"(print_string '{self.random.choice(['ab', 'x', ' ', 'hi!'])}')"]
+        if kind == 3:
+            return [f"(set t (% {variable} 26))", "(set t (+ t 97))", f"(set_char s {self.random.randint(0, 3)} t)"]
+        if kind == 4:
+            return ["(print_string s)"]
+        if kind == 5:
+            return [f"(set {variable} {self.value()})"]
+        if kind == 6:
+            branches = [f"(set {self.random.choice(self.variables)} {self.value()})" for _ in range(2)]
+            return [f"(if {self.condition()} {branches[0]} {branches[1]})"]
+
+        counter = f"c{self.counters}"
+        self.counters += 1
+        body = [line for _ in range(self.random.randint(1, 3)) for line in self.statement(depth + 1)]
+        condition = f"(!= {counter} {self.random.randint(1, 6)})"
+        if self.random.random() < 0.3:
+            condition = f"(& {condition} {self.condition()})"
+        return [
+            f"(set {counter} 0)",
+            f"(while {condition}",
+            *(f"  {line}" for line in body),
+            f"  (set {counter} (+ {counter} 1)))",
+        ]
+
+    def program(self) -> str:
+        lines = [f"(set {variable} {self.random.randint(0, 300)})" for variable in self.variables]
+        lines += [
+            "(set t 0)",
+            "(alloc s 4)",
+            "(fun add3 (a b) (set r (+ a b)) (+ r 3))",
+            "(fun sum_to (n acc) (if (= n 0) acc (sum_to (- n 1) (+ acc n))))",
+        ]
+        for _ in range(self.random.randint(3, 12)):
+            lines.extend(self.statement(0))
+        return "\n".join(lines)
+
+    def inputs(self) -> list[list[str]]:
+        return [
+            [*"".join(self.random.choice("abcxyz019 ") for _ in range(self.random.randint(0, 8))), "\0"]
+            for _ in range(self.random.randint(1, 3))
+        ]
+
+
+def random_programs(count: int, seed: int = 0) -> dict[str, tuple[str, list[list[str]]]]:
+    programs = {}
+    for index in range(count):
+        generator = ProgramGenerator(seed + index)
+        programs[f"random-{seed + index}"] = (generator.program(), generator.inputs())
+    return programs
+
+
+def main(random_count=100, seed=0, workers=None):
+    programs = {**golden_programs(), **random_programs(int(random_count), int(seed))}
+    report = check(programs, workers=None if workers is None else int(workers))
+
+    for name, index, config, fields in report["mismatches"]:
+        print(f"MISMATCH {name} input {index} {config}: {', '.join(fields)}")
+    for config, rate in report["throughput"].items():
+        print(f"{config:18} {rate:12.0f} instr/s")
+    print("programs:", len(programs), "mismatches:", len(report["mismatches"]))
+    return len(report["mismatches"])
+
+
+if __name__ == "__main__":
+    assert len(sys.argv) <= 4, "Wrong arguments: conformance.py [random_count [seed [workers]]]"
+    sys.exit(1 if main(*sys.argv[1:]) else 0)
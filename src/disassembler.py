@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import itertools
+import pickle
+import sys
+from collections.abc import Iterable, Iterator
+from typing import TextIO
+
+from src.isa import DECODE_TABLE, AddressingType, Opcode, hex_to_mnemonic
+from src.machine.metrics import image_layout
+
+LISTING_CHUNK = 4096
+
+# prefixes of the words that jump or call directly, their operand is a code address; the operand of
+# an indirect or SP-relative one is a data or stack slot and is shown as is
+JUMP_PREFIXES = {
+    prefix: opcode
+    for prefix, (opcode, addr_type) in enumerate(DECODE_TABLE)
+    if opcode in {Opcode.JMP, Opcode.JZ, Opcode.JNZ, Opcode.CALL} and addr_type is AddressingType.DIRECT
+}
+
+
+def first_instruction(image: list[str]) -> int:
+    """Address of the first instruction after word 0, the words before it are data."""
+    return max(image_layout(image)[0], 1)
+
+
+def char_of(value: int) -> str | None:
+    return chr(value) if 32 < value <= sys.maxunicode else None
+
+
+def listing(image: list[str]) -> Iterator[str]:
+    """The translator's debug listing of an image, a line at a time: word 0, the data words with
+    their values and characters, then the instructions."""
+    code_start = first_instruction(image)
+
+    yield f"0 - {image[0]} - {hex_to_mnemonic(image[0])}"
+    yield "\nDATA MEMORY"
+    for addr in range(1, code_start):
+        word = image[addr]
+        value = int(word, 16)
+        char = char_of(value)
+        yield f"{addr} - {word} - {value}" if char is None else f"{addr} - {word} - {value} - {char}"
+
+    yield "\nCODE MEMORY"
+    for addr in range(code_start, len(image)):
+        word = image[addr]
+        yield f"{addr} - {word} - {hex_to_mnemonic(word)}"
+
+
+def write_lines(lines: Iterable[str], file: TextIO, chunk_size: int = LISTING_CHUNK) -> None:
+    """Writes `lines` joined by newlines, `chunk_size` lines at a time."""
+    lines = iter(lines)
+    separator = ""
+    while chunk := list(itertools.islice(lines, chunk_size)):
+        file.write(separator + "\n".join(chunk))
+        separator = "\n"
+
+
+class Disassembler:
+    """Renders address ranges of an image on demand.
+
+    Labels come from a single pass over the code, made on first use: word 0 jumps to `start`,
+    targets of direct calls are `fun_<addr>` and of the other direct jumps `L<addr>`. Direct jumps
+    and calls show their target as a label, data words show their value and character.
+    """
+
+    def __init__(self, image: list[str]):
+        self.image = image
+        self.code_start = first_instruction(image)
+        self._labels: dict[int, str] | None = None
+
+    @property
+    def labels(self) -> dict[int, str]:
+        if self._labels is None:
+            labels = {}
+            for addr in itertools.chain((0,), range(self.code_start, len(self.image))):
+                word = self.image[addr]
+                opcode = JUMP_PREFIXES.get(int(word[:2], 16))
+                if opcode is not None:
+                    target = int(word[2:], 16)
+                    if opcode is Opcode.CALL:
+                        labels[target] = f"fun_{target}"
+                    else:
+                        labels.setdefault(target, f"L{target}")
+            labels[self.code_start] = "start"
+            self._labels = labels
+        return self._labels
+
+    def line(self, addr: int) -> str:
+        word = self.image[addr]
+
+        if 0 < addr < self.code_start:
+            value = int(word, 16)
+            char = char_of(value)
+            text = f".word {value}" if char is None else f".word {value}  ; {char!r}"
+        else:
+            opcode = JUMP_PREFIXES.get(int(word[:2], 16))
+            text = hex_to_mnemonic(word) if opcode is None else f"{opcode} {self.labels[int(word[2:], 16)]}"
+
+        return f"{addr:6}  {word}  {text}"
+
+    def render(self, start: int = 0, end: int | None = None) -> Iterator[str]:
+        """Lines of the words from `start` up to `end`, each labelled word preceded by its label."""
+        labels = self.labels
+        for addr in range(max(start, 0), min(len(self.image), end if end is not None else len(self.image))):
+            if addr in labels:
+                yield f"{labels[addr]}:"
+            yield self.line(addr)
+
+
+def main(binary_file, start=0, end=None):
+    with open(binary_file, "rb") as f:
+        image = pickle.load(f)
+
+    disassembler = Disassembler(image)
+    write_lines(disassembler.render(int(start), None if end is None else int(end)), sys.stdout)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    assert 2 <= len(sys.argv) <= 4, "Wrong arguments: disassembler.py <binary_code_file> [start [end]]"
+    main(*sys.argv[1:])
@@ -2,6 +2,10 @@ from __future__ import annotations
 
 from enum import Enum
 
+WORD_SIZE = 32
+WORD_MASK = (1 << WORD_SIZE) - 1
+SIGN_BIT = 1 << (WORD_SIZE - 1)
+
 
 class Opcode(Enum):
     ADD = "add", 0x0
@@ -26,6 +30,11 @@ class Opcode(Enum):
 
     HLT = "halt", 0xF
 
+    INC = "increment", 0x0
+    DEC = "decrement", 0x1
+    JNZ = "jnz", 0xE
+    PRINTS = "print string", 0x7
+
     def __str__(self):
         return str(self.value[0])
 
@@ -38,6 +47,8 @@ class AddressingType(Enum):
     INDIRECT = "$", 0x1
     OPERAND_LOAD = "#", 0x2
     SP_INDIRECT = "&", 0x3
+    POST_INCREMENT = "$+", 0x4
+    POST_DECREMENT = "$-", 0x5
 
     def __str__(self):
         return str(self.value[0])
@@ -46,36 +57,67 @@ class AddressingType(Enum):
         return format(self.value[1], "X")
 
 
-def command_from_hex(hex_command: str) -> tuple[Opcode | None, AddressingType | None, int]:
+# INC, DEC, JNZ and PRINTS share the opcode nibble of ADD, SUB, JZ and PRINT and are told apart
+# by the addressing nibble: 0x6 for a direct argument or none, 0x7 for an SP-relative one.
+ALTERNATE_OPCODES = {Opcode.INC: Opcode.ADD, Opcode.DEC: Opcode.SUB, Opcode.JNZ: Opcode.JZ, Opcode.PRINTS: Opcode.PRINT}
+ALTERNATE_ADDRESSING = {0x6: AddressingType.DIRECT, 0x7: AddressingType.SP_INDIRECT}
+POST_INDEXED = {AddressingType.POST_INCREMENT: 1, AddressingType.POST_DECREMENT: -1}
+
+
+def decode_prefix(prefix: int) -> tuple[Opcode | None, AddressingType | None]:
+    """Opcode and addressing type of a word starting with the byte `prefix`."""
     opcode = None
     addr_type = None
-    arg = int(hex_command[2:], 16)
+    opcode_nibble, addr_nibble = prefix >> 4, prefix & 0xF
+    alternate = addr_nibble in ALTERNATE_ADDRESSING
 
     for o in Opcode:
-        if o.value[1] == int(hex_command[0], 16):
+        if o.value[1] == opcode_nibble and (o in ALTERNATE_OPCODES) == alternate:
             opcode = o
 
     for at in AddressingType:
-        if at.value[1] == int(hex_command[1], 16):
+        if at.value[1] == addr_nibble:
             addr_type = at
 
-    return opcode, addr_type, arg
+    if alternate:
+        addr_type = ALTERNATE_ADDRESSING[addr_nibble]
 
+    return opcode, addr_type
 
-def hex_to_mnemonic(hex_command: str) -> str:
-    opcode, addr_type, arg = command_from_hex(hex_command)
-    mnemonic = str(opcode)
 
-    if opcode not in {Opcode.PRINT, Opcode.INPUT, Opcode.RETURN, Opcode.PUSH, Opcode.POP, Opcode.HLT}:
-        mnemonic += f" {addr_type}{arg}"
+DECODE_TABLE = [decode_prefix(prefix) for prefix in range(256)]
+
+
+def command_from_hex(hex_command: str) -> tuple[Opcode | None, AddressingType | None, int]:
+    opcode, addr_type = DECODE_TABLE[int(hex_command[:2], 16)]
+    return opcode, addr_type, int(hex_command[2:], 16)
 
-    return mnemonic
+
+NO_OPERAND_OPCODES = {Opcode.PRINT, Opcode.PRINTS, Opcode.INPUT, Opcode.RETURN, Opcode.PUSH, Opcode.POP, Opcode.HLT}
+
+
+def mnemonic_head(opcode: Opcode | None, addr_type: AddressingType | None) -> tuple[str, bool]:
+    """Mnemonic of an instruction up to its operand and whether the operand is shown."""
+    if opcode in NO_OPERAND_OPCODES:
+        return str(opcode), False
+    return f"{opcode} {addr_type}", True
+
+
+MNEMONIC_TABLE = [mnemonic_head(opcode, addr_type) for opcode, addr_type in DECODE_TABLE]
+
+
+def hex_to_mnemonic(hex_command: str) -> str:
+    head, has_operand = MNEMONIC_TABLE[int(hex_command[:2], 16)]
+    return f"{head}{int(hex_command[2:], 16)}" if has_operand else head
 
 
 def command_to_hex(opcode: Opcode, addressing_type: AddressingType | None = None, operand: int | None = None) -> str:
     binary = opcode.to_binary()
 
-    if addressing_type:
+    if opcode in ALTERNATE_OPCODES:
+        addressing_type = addressing_type or AddressingType.DIRECT
+        binary += next(format(code, "X") for code, at in ALTERNATE_ADDRESSING.items() if at is addressing_type)
+    elif addressing_type:
         binary += addressing_type.to_binary()
     else:
         binary = binary.ljust(2, "0")
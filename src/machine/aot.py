@@ -0,0 +1,237 @@
+from __future__ import annotations
+
+import importlib.util
+import pickle
+import py_compile
+import sys
+
+from src.isa import POST_INDEXED, WORD_MASK, AddressingType, Opcode, hex_to_mnemonic
+from src.machine.basic_blocks import decode, find_basic_blocks
+from src.machine.control_unit import instruction_ticks
+from src.machine.data_path import MEMORY_SIZE
+
+MODULE_HEADER = '''"""Generated by src.machine.aot from a translated image, do not edit."""
+
+import logging
+import sys
+
+MASK = {mask}
+MEMORY_SIZE = {memory_size}
+CODE = frozenset({code})
+IMAGE = {image}
+
+
+class SelfModifyingCodeError(Exception):
+    pass
+
+
+def run(input_tokens, limit):
+    memory = IMAGE + [0] * (MEMORY_SIZE - len(IMAGE))
+    output = []
+    acc = alu = ar = ip = 0
+    sp = MEMORY_SIZE
+    input_pos = 0
+    instr_counter = ticks = 0
+'''
+
+MODULE_FOOTER = """
+    try:
+        while instr_counter < limit:
+            entry = blocks.get(ip)
+            if entry is not None and instr_counter + entry[1] <= limit:
+                ip = entry[0]()
+            else:
+                ip = steps[ip]()
+
+    except EOFError:
+        logging.warning("Input buffer is empty!")
+
+    except StopIteration:
+        pass
+
+    if instr_counter >= limit:
+        logging.warning("Limit exceeded!")
+
+    return "".join(output), instr_counter, ticks
+
+
+def main(input_file, limit=1000):
+    with open(input_file, encoding="utf-8") as file:
+        input_tokens = list(file.read()) + ["\\0"]
+
+    output, instr_counter, ticks = run(input_tokens, int(limit))
+
+    print(output)
+    print(f"instr_counter: {instr_counter}, ticks: {ticks}")
+
+
+if __name__ == "__main__":
+    assert len(sys.argv) in (2, 3), "Wrong arguments: <module>.py <input_file> [limit]"
+    main(*sys.argv[1:])
+"""
+
+NONLOCALS = "nonlocal acc, alu, ar, sp, input_pos, instr_counter, ticks"
+
+
+def guarded_write(addr_expr: str, value_expr: str) -> list[str]:
+    return [
+        f"if {addr_expr} in CODE:",
+        f"    raise SelfModifyingCodeError({addr_expr})",
+        f"memory[{addr_expr}] = {value_expr}",
+    ]
+
+
+def address_selection(addr_type: AddressingType | None, arg: int) -> list[str]:
+    if addr_type is AddressingType.DIRECT:
+        return [f"ar = {arg}"]
+    if addr_type is AddressingType.INDIRECT:
+        return [f"ar = alu = memory[{arg}]"]
+    if addr_type is AddressingType.SP_INDIRECT:
+        return [f"ar = alu = (sp + {arg}) & MASK"]
+    if addr_type in POST_INDEXED:
+        return [f"ar = alu = memory[{arg}]", *guarded_write(str(arg), f"(ar + {POST_INDEXED[addr_type]}) & MASK")]
+    return []
+
+
+def operand(addr_type: AddressingType | None, arg: int) -> tuple[list[str], str]:
+    if addr_type is AddressingType.OPERAND_LOAD:
+        return [], str(arg & WORD_MASK)
+    return address_selection(addr_type, arg), "memory[ar]"
+
+
+def instruction_body(addr: int, opcode: Opcode, addr_type: AddressingType | None, arg: int) -> list[str]:
+    if opcode in {Opcode.ADD, Opcode.SUB, Opcode.CMP, Opcode.DIV, Opcode.MOD}:
+        lines, value = operand(addr_type, arg)
+        symbol = {Opcode.ADD: "+", Opcode.SUB: "-", Opcode.CMP: "-", Opcode.DIV: "//", Opcode.MOD: "%"}[opcode]
+        target = "alu" if opcode is Opcode.CMP else "acc = alu"
+        return [*lines, f"{target} = (acc {symbol} {value}) & MASK"]
+
+    if opcode is Opcode.INC or opcode is Opcode.DEC:
+        symbol = "+" if opcode is Opcode.INC else "-"
+        lines = [*address_selection(addr_type, arg), f"acc = alu = (memory[ar] {symbol} 1) & MASK"]
+        return [*lines, *guarded_write("ar", "acc")]
+
+    if opcode is Opcode.LOAD:
+        lines, value = operand(addr_type, arg)
+        return [*lines, f"acc = alu = {value}"]
+
+    if opcode is Opcode.SAVE:
+        return [*address_selection(addr_type, arg), *guarded_write("ar", "acc")]
+
+    return {
+        Opcode.PUSH: ["sp -= 1", *guarded_write("sp", "acc")],
+        Opcode.POP: ["sp += 1"],
+        Opcode.PRINT: ["output.append(chr(acc))"],
+        Opcode.PRINTS: [
+            "ar = acc",
+            "while memory[ar]:",
+            "    output.append(chr(memory[ar]))",
+            "    ar += 1",
+            "ticks += ar - acc + 1",
+            "acc = alu = 0",
+        ],
+        Opcode.INPUT: [
+            "if input_pos >= len(input_tokens):",
+            "    raise EOFError()",
+            "acc = ord(input_tokens[input_pos])",
+            "input_pos += 1",
+        ],
+        Opcode.CALL: ["sp -= 1", *guarded_write("sp", str(addr + 1))],
+        Opcode.RETURN: ["alu = memory[sp]", "sp += 1"],
+        Opcode.HLT: ["raise StopIteration()"],
+    }.get(opcode, [])
+
+
+def next_ip_expression(addr: int, opcode: Opcode, arg: int) -> str:
+    if opcode in {Opcode.JMP, Opcode.CALL}:
+        return str(arg)
+    if opcode is Opcode.JZ:
+        return f"{arg} if alu == 0 else {addr + 1}"
+    if opcode is Opcode.JNZ:
+        return f"{addr + 1} if alu == 0 else {arg}"
+    if opcode is Opcode.RETURN:
+        return "alu"
+    return str(addr + 1)
+
+
+def generate_function(name: str, memory: list[int], addrs: list[int], ticks: int) -> list[str]:
+    lines = [f"def {name}():", f"    {NONLOCALS}"]
+
+    for addr in addrs:
+        opcode, addr_type, arg = decode(memory, addr)
+        lines.append(f"    # {addr}: {hex_to_mnemonic(f'{memory[addr]:08X}')}")
+        lines.extend(f"    {line}" for line in instruction_body(addr, opcode, addr_type, arg))
+
+    opcode, _, arg = decode(memory, addrs[-1])
+    lines.append(f"    instr_counter += {len(addrs)}")
+    lines.append(f"    ticks += {ticks}")
+    lines.append(f"    return {next_ip_expression(addrs[-1], opcode, arg)}")
+
+    return lines
+
+
+def generate_source(image: list[str], relocations: list[int] | None = None) -> str:
+    """Translates a machine image into the source of a standalone Python module.
+
+    Every basic block of the reachable code becomes one function of straight-line Python that
+    updates the instruction and tick counters once. Single-instruction functions are generated
+    as well and are used to stay exact near the instruction limit or on jumps into a block.
+    """
+    memory = [int(word, 16) for word in image]
+    blocks = find_basic_blocks(memory, relocations)
+    instructions = sorted(addr for block in blocks.values() for addr in block.instructions)
+
+    header = MODULE_HEADER.format(
+        mask=hex(WORD_MASK),
+        memory_size=MEMORY_SIZE,
+        code=instructions,
+        image=memory,
+    )
+    lines = [header]
+    body = []
+
+    for addr in instructions:
+        ticks = instruction_ticks(*decode(memory, addr)[:2])
+        body.extend(generate_function(f"step_{addr}", memory, [addr], ticks))
+    body.append("steps = {" + ", ".join(f"{addr}: step_{addr}" for addr in instructions) + "}")
+
+    for start, block in blocks.items():
+        body.extend(generate_function(f"block_{start}", memory, block.instructions, block.ticks))
+    body.append("blocks = {" + ", ".join(f"{s}: (block_{s}, {b.instr_count})" for s, b in blocks.items()) + "}")
+
+    lines.extend(f"    {line}" for line in body)
+    lines.append(MODULE_FOOTER)
+
+    return "\n".join(lines)
+
+
+def compile_image(image: list[str], module_file: str) -> str | None:
+    with open(module_file, "w", encoding="utf-8") as f:
+        f.write(generate_source(image))
+
+    return py_compile.compile(module_file, doraise=True)
+
+
+def load_module(module_file: str):
+    spec = importlib.util.spec_from_file_location("lisp_image", module_file)
+    assert spec is not None, f"Can't load {module_file}"
+    assert spec.loader is not None, f"Can't load {module_file}"
+
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main(bin_code_file, module_file):
+    with open(bin_code_file, "rb") as f:
+        image = pickle.load(f)
+
+    bytecode_file = compile_image(image, module_file)
+
+    print("module:", module_file, "bytecode:", bytecode_file)
+
+
+if __name__ == "__main__":
+    assert len(sys.argv) == 3, "Wrong arguments: aot.py <binary_code_file> <module_file>"
+    _, code_file, module_file = sys.argv
+    main(code_file, module_file)
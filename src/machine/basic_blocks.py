@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+from src.isa import AddressingType, Opcode, command_from_hex
+from src.machine.control_unit import instruction_ticks
+
+BRANCHES = {Opcode.JMP, Opcode.JZ, Opcode.JNZ, Opcode.CALL}
+TERMINATORS = {Opcode.JMP, Opcode.JZ, Opcode.JNZ, Opcode.CALL, Opcode.RETURN, Opcode.HLT}
+
+
+class BasicBlock:
+    """Straight-line run of instructions entered only at its first one.
+
+    Control leaves a block only after its last instruction. INPUT and HLT always start a
+    block, so an empty input buffer or a halt stops the machine before any instruction of
+    the block has run. A block made of HLT stops the machine without advancing counters.
+    `ticks` leaves out the per-word ticks of PRINTS, which depend on the string.
+    """
+
+    def __init__(self, instructions: list[int], ticks: int, successors: list[int]):
+        self.instructions = instructions
+        self.ticks = ticks
+        self.successors = successors
+
+    @property
+    def start(self) -> int:
+        return self.instructions[0]
+
+    @property
+    def end(self) -> int:
+        return self.instructions[-1] + 1
+
+    @property
+    def instr_count(self) -> int:
+        return len(self.instructions)
+
+    def __repr__(self):
+        return "BasicBlock({}..{}, instr: {}, ticks: {}, successors: {})".format(
+            self.start, self.end - 1, self.instr_count, self.ticks, self.successors
+        )
+
+
+def decode(memory: list[int], addr: int) -> tuple[Opcode, AddressingType | None, int]:
+    opcode, addr_type, arg = command_from_hex(f"{memory[addr]:08X}")
+    assert opcode is not None
+    return opcode, addr_type, arg
+
+
+def successors(memory: list[int], addr: int) -> list[int]:
+    opcode, _, arg = decode(memory, addr)
+
+    if opcode is Opcode.JMP:
+        return [arg]
+    if opcode in {Opcode.JZ, Opcode.JNZ, Opcode.CALL}:
+        return [arg, addr + 1]
+    if opcode in {Opcode.RETURN, Opcode.HLT}:
+        return []
+    return [addr + 1]
+
+
+def reachable_instructions(memory: list[int], entry: int = 0) -> list[int]:
+    reached = set()
+    worklist = [entry]
+
+    while worklist:
+        addr = worklist.pop()
+        if addr in reached or not 0 <= addr < len(memory):
+            continue
+        reached.add(addr)
+        worklist.extend(successors(memory, addr))
+
+    return sorted(reached)
+
+
+def find_leaders(memory: list[int], instructions: list[int], relocations: list[int] | None = None) -> set[int]:
+    """Block entries: the image entry, branch targets, instructions after terminators, INPUT and HLT.
+
+    Branch targets come from the translator's relocation table when it is given, otherwise from
+    the operands of every reachable JMP, JZ, JNZ and CALL.
+    """
+    leaders = {0}
+    branch_sites = instructions if relocations is None else relocations
+
+    for addr in branch_sites:
+        opcode, _, arg = decode(memory, addr)
+        if opcode in BRANCHES:
+            leaders.add(arg)
+
+    for addr in instructions:
+        opcode, _, _ = decode(memory, addr)
+
+        if opcode in TERMINATORS:
+            leaders.add(addr + 1)
+        if opcode in {Opcode.INPUT, Opcode.HLT}:
+            leaders.add(addr)
+
+    return leaders
+
+
+def find_basic_blocks(memory: list[int], relocations: list[int] | None = None) -> dict[int, BasicBlock]:
+    """Splits the code reachable from address 0 into basic blocks, keyed by their first address.
+
+    `memory` holds the loaded image as integers, `relocations` is Translator.relocations.
+    """
+    instructions = reachable_instructions(memory)
+    leaders = find_leaders(memory, instructions, relocations)
+    runs: list[list[int]] = []
+
+    for addr in instructions:
+        if addr in leaders or not runs or runs[-1][-1] != addr - 1:
+            runs.append([])
+        runs[-1].append(addr)
+
+    blocks = {}
+    for run in runs:
+        ticks = sum(instruction_ticks(*decode(memory, addr)[:2]) for addr in run)
+        blocks[run[0]] = BasicBlock(run, ticks, successors(memory, run[-1]))
+
+    return blocks
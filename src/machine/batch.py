@@ -0,0 +1,228 @@
+from __future__ import annotations
+
+import logging
+
+import numpy as np
+
+from src.isa import POST_INDEXED, WORD_MASK, AddressingType, Opcode, command_from_hex
+from src.machine.control_unit import instruction_ticks
+from src.machine.data_path import MEMORY_SIZE
+
+RUNNING, HALTED, INPUT_EMPTY, LIMIT_EXCEEDED = range(4)
+
+
+class BatchMachine:
+    """N copies of the machine running one image in lockstep, registers and memories held in NumPy arrays.
+
+    Every step the running lanes are grouped by the instruction word at their IP, and each
+    group executes that instruction with vectorised operations. A lane stops on HLT, on INPUT
+    with its input exhausted or on reaching the instruction limit, and the rest carry on.
+    Output, instruction and tick counters of every lane match `machine.simulation`.
+    """
+
+    def __init__(self, memory: list[str], inputs: list[list[str]], limit: int):
+        lanes = len(inputs)
+        image = np.array([int(word, 16) for word in memory], dtype=np.uint32)
+
+        self.memory = np.zeros((lanes, MEMORY_SIZE), dtype=np.uint32)
+        self.memory[:, : len(image)] = image
+
+        self.acc = np.zeros(lanes, dtype=np.int64)
+        self.alu = np.zeros(lanes, dtype=np.int64)
+        self.ar = np.zeros(lanes, dtype=np.int64)
+        self.ip = np.zeros(lanes, dtype=np.int64)
+        self.sp = np.full(lanes, MEMORY_SIZE, dtype=np.int64)
+        self.tick = np.zeros(lanes, dtype=np.int64)
+        self.instr = np.zeros(lanes, dtype=np.int64)
+        self.state = np.full(lanes, RUNNING if limit > 0 else LIMIT_EXCEEDED, dtype=np.int8)
+        self.limit = limit
+
+        input_width = max((len(tokens) for tokens in inputs), default=0)
+        self.input = np.zeros((lanes, max(input_width, 1)), dtype=np.int64)
+        for lane, tokens in enumerate(inputs):
+            self.input[lane, : len(tokens)] = [ord(token) for token in tokens]
+        self.input_len = np.array([len(tokens) for tokens in inputs], dtype=np.int64)
+        self.input_pos = np.zeros(lanes, dtype=np.int64)
+
+        self.output = np.zeros((lanes, 16), dtype=np.int64)
+        self.output_len = np.zeros(lanes, dtype=np.int64)
+
+        self.decoded: dict[int, tuple[Opcode, AddressingType | None, int, int]] = {}
+
+    def decode(self, word: int) -> tuple[Opcode, AddressingType | None, int, int]:
+        if word not in self.decoded:
+            opcode, addr_type, arg = command_from_hex(f"{word:08X}")
+            assert opcode is not None
+            self.decoded[word] = opcode, addr_type, arg, instruction_ticks(opcode, addr_type)
+        return self.decoded[word]
+
+    def select_address(self, idx, addr_type: AddressingType | None, arg: int) -> None:
+        if addr_type is AddressingType.DIRECT:
+            self.ar[idx] = arg
+
+        elif addr_type is AddressingType.INDIRECT:
+            self.alu[idx] = self.ar[idx] = self.memory[idx, arg]
+
+        elif addr_type is AddressingType.SP_INDIRECT:
+            self.alu[idx] = self.ar[idx] = (self.sp[idx] + arg) & WORD_MASK
+
+        elif addr_type in POST_INDEXED:
+            self.alu[idx] = self.ar[idx] = self.memory[idx, arg]
+            self.memory[idx, arg] = (self.ar[idx] + POST_INDEXED[addr_type]) & WORD_MASK
+
+    def fetch_operand(self, idx, addr_type: AddressingType | None, arg: int):
+        if addr_type is AddressingType.OPERAND_LOAD:
+            return np.int64(arg)
+
+        self.select_address(idx, addr_type, arg)
+        return self.memory[idx, self.ar[idx]].astype(np.int64)
+
+    def execute_alu(self, idx, opcode: Opcode, addr_type: AddressingType | None, arg: int) -> None:
+        left, right = self.acc[idx], self.fetch_operand(idx, addr_type, arg)
+
+        if opcode is Opcode.ADD:
+            result = (left + right) & WORD_MASK
+        elif opcode is Opcode.SUB or opcode is Opcode.CMP:
+            result = (left - right) & WORD_MASK
+        else:
+            if np.any(right == 0):
+                raise ZeroDivisionError()
+            result = left // right if opcode is Opcode.DIV else left % right
+
+        self.alu[idx] = result
+        if opcode is not Opcode.CMP:
+            self.acc[idx] = result
+
+    def execute_increment(self, idx, opcode: Opcode, addr_type: AddressingType | None, arg: int) -> None:
+        self.select_address(idx, addr_type, arg)
+        step = 1 if opcode is Opcode.INC else -1
+
+        self.alu[idx] = self.acc[idx] = (self.memory[idx, self.ar[idx]].astype(np.int64) + step) & WORD_MASK
+        self.memory[idx, self.ar[idx]] = self.acc[idx]
+
+    def execute_control_flow(self, idx, opcode: Opcode, arg: int) -> None:
+        if opcode is Opcode.JMP:
+            self.ip[idx] = arg
+
+        elif opcode is Opcode.JZ:
+            self.ip[idx] = np.where(self.alu[idx] == 0, arg, self.ip[idx] + 1)
+
+        elif opcode is Opcode.JNZ:
+            self.ip[idx] = np.where(self.alu[idx] == 0, self.ip[idx] + 1, arg)
+
+        elif opcode is Opcode.CALL:
+            self.sp[idx] -= 1
+            self.memory[idx, self.sp[idx]] = self.ip[idx] + 1
+            self.ip[idx] = arg
+
+        elif opcode is Opcode.RETURN:
+            self.alu[idx] = self.ip[idx] = self.memory[idx, self.sp[idx]]
+            self.sp[idx] += 1
+
+    def execute_input(self, idx):
+        empty = self.input_pos[idx] >= self.input_len[idx]
+        self.state[idx[empty]] = INPUT_EMPTY
+
+        idx = idx[~empty]
+        self.acc[idx] = self.input[idx, self.input_pos[idx]]
+        self.input_pos[idx] += 1
+        return idx
+
+    def execute_output(self, idx) -> None:
+        if self.output_len[idx].max() >= self.output.shape[1]:
+            self.output = np.concatenate([self.output, np.zeros_like(self.output)], axis=1)
+
+        self.output[idx, self.output_len[idx]] = self.acc[idx]
+        self.output_len[idx] += 1
+
+    def execute_output_string(self, idx) -> None:
+        self.ar[idx] = self.acc[idx]
+        active = idx
+
+        while True:
+            words = self.memory[active, self.ar[active]].astype(np.int64)
+            self.tick[active] += 1
+            active, words = active[words != 0], words[words != 0]
+            if not active.size:
+                break
+
+            self.acc[active] = words
+            self.execute_output(active)
+            self.ar[active] += 1
+
+        self.acc[idx] = self.alu[idx] = 0
+
+    def execute(self, idx, word: int) -> None:
+        opcode, addr_type, arg, ticks = self.decode(word)
+
+        if opcode is Opcode.HLT:
+            self.state[idx] = HALTED
+            return
+
+        if opcode in {Opcode.JMP, Opcode.JZ, Opcode.JNZ, Opcode.CALL, Opcode.RETURN}:
+            self.execute_control_flow(idx, opcode, arg)
+        else:
+            if opcode in {Opcode.ADD, Opcode.SUB, Opcode.CMP, Opcode.DIV, Opcode.MOD}:
+                self.execute_alu(idx, opcode, addr_type, arg)
+            elif opcode is Opcode.INC or opcode is Opcode.DEC:
+                self.execute_increment(idx, opcode, addr_type, arg)
+            elif opcode is Opcode.LOAD:
+                self.alu[idx] = self.acc[idx] = self.fetch_operand(idx, addr_type, arg)
+            elif opcode is Opcode.SAVE:
+                self.select_address(idx, addr_type, arg)
+                self.memory[idx, self.ar[idx]] = self.acc[idx]
+            elif opcode is Opcode.PUSH:
+                self.sp[idx] -= 1
+                self.memory[idx, self.sp[idx]] = self.acc[idx]
+            elif opcode is Opcode.POP:
+                self.sp[idx] += 1
+            elif opcode is Opcode.PRINT:
+                self.execute_output(idx)
+            elif opcode is Opcode.PRINTS:
+                self.execute_output_string(idx)
+            elif opcode is Opcode.INPUT:
+                idx = self.execute_input(idx)
+            self.ip[idx] += 1
+
+        self.tick[idx] += ticks
+        self.instr[idx] += 1
+
+    def step(self) -> None:
+        lanes = np.flatnonzero(self.state == RUNNING)
+        words = self.memory[lanes, self.ip[lanes]].astype(np.int64)
+        keys = (self.ip[lanes] << 32) | words
+
+        order = np.argsort(keys, kind="stable")
+        keys, lanes, words = keys[order], lanes[order], words[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+        for start, group in zip(starts, np.split(lanes, starts[1:])):
+            self.execute(group, int(words[start]))
+
+        running = self.state == RUNNING
+        self.state[running & (self.instr >= self.limit)] = LIMIT_EXCEEDED
+
+    def run(self) -> None:
+        while np.any(self.state == RUNNING):
+            self.step()
+
+        logging.debug(
+            "batch: %d lanes, %d halted, %d input empty, %d limit exceeded",
+            len(self.state),
+            np.count_nonzero(self.state == HALTED),
+            np.count_nonzero(self.state == INPUT_EMPTY),
+            np.count_nonzero(self.state == LIMIT_EXCEEDED),
+        )
+
+    def results(self) -> list[tuple[str, int, int]]:
+        return [
+            ("".join(map(chr, self.output[lane, : self.output_len[lane]])), int(self.instr[lane]), int(self.tick[lane]))
+            for lane in range(len(self.state))
+        ]
+
+
+def batch_simulation(memory: list[str], inputs: list[list[str]], limit: int) -> list[tuple[str, int, int]]:
+    """Runs one image over many inputs, returns `machine.simulation` results in the order of `inputs`."""
+    machine = BatchMachine(memory, inputs, limit)
+    machine.run()
+    return machine.results()
@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import operator
+
+from src.isa import POST_INDEXED, WORD_MASK, AddressingType, Opcode, command_from_hex
+from src.machine.basic_blocks import decode, find_basic_blocks
+from src.machine.control_unit import ControlUnit, instruction_ticks
+from src.machine.data_path import DataPath
+
+ALU_FUNCTIONS = {
+    Opcode.ADD: operator.add,
+    Opcode.SUB: operator.sub,
+    Opcode.CMP: operator.sub,
+    Opcode.DIV: operator.floordiv,
+    Opcode.MOD: operator.mod,
+}
+
+
+class Registers:
+    __slots__ = ("acc", "alu", "ar", "input_pos", "instr", "limit", "sp", "tick")
+
+    def __init__(self, data_path: DataPath):
+        self.acc = data_path.acc
+        self.alu = data_path.alu
+        self.ar = data_path.ar
+        self.sp = data_path.sp
+        self.tick = 0
+        self.instr = 0
+        self.limit = 0
+        self.input_pos = 0
+
+
+class ClosureEngine:
+    """Runs the image as a chain of closures, one per basic block.
+
+    Each block is decoded once, the first time it is reached, into closures with operands,
+    addressing modes and tick costs baked in. A block closure runs them, updates the instruction
+    and tick counters once and returns the closure of the next block, so the main loop only
+    follows these references. Near the instruction limit and on jumps into the middle of a block
+    single-instruction closures are used instead, keeping counters exact. A write into compiled
+    code drops every closure and switches to single instructions, as block boundaries may be
+    stale; a block that overwrites its own later instructions still runs them as decoded.
+    Carry and overflow flags are not tracked.
+    """
+
+    def __init__(self, data_path: DataPath, relocations: list[int] | None = None):
+        self.data_path = data_path
+        self.regs = Registers(data_path)
+
+        self.memory = [int(word, 16) for word in data_path.memory]
+        self.blocks = find_basic_blocks(self.memory, relocations)
+        self.use_blocks = True
+
+        self.stubs = [self.make_stub(addr) for addr in range(len(self.memory))]
+        self.ops = list(self.stubs)
+        self.compiled: set[int] = set()
+        self.addr_of = {stub: addr for addr, stub in enumerate(self.stubs)}
+
+    @property
+    def instr_counter(self) -> int:
+        return self.regs.instr
+
+    @property
+    def tick_counter(self) -> int:
+        return self.regs.tick
+
+    def make_stub(self, addr: int):
+        def stub():
+            if self.use_blocks and addr in self.blocks:
+                op = self.compile_block(addr)
+            else:
+                op = self.compile_step(addr)
+            self.ops[addr] = op
+            self.addr_of[op] = addr
+            return op()
+
+        return stub
+
+    def write(self, addr: int, value: int) -> None:
+        self.memory[addr] = value
+        if addr in self.compiled:
+            self.use_blocks = False
+            self.compiled.clear()
+            self.ops[:] = self.stubs
+
+    def compile_step(self, ip: int):
+        regs, ops = self.regs, self.ops
+        effect = self.compile_effect(ip)
+        ticks = instruction_ticks(*decode(self.memory, ip)[:2])
+        self.compiled.add(ip)
+
+        def step():
+            next_ip = effect()
+            regs.tick += ticks
+            regs.instr += 1
+            return ops[next_ip]
+
+        return step
+
+    def compile_block(self, start: int):
+        regs, ops = self.regs, self.ops
+        block = self.blocks[start]
+        effects = [self.compile_effect(addr) for addr in block.instructions]
+        body, last = tuple(effects[:-1]), effects[-1]
+        length, ticks = block.instr_count, block.ticks
+        step = self.compile_step(start)
+        self.compiled.update(block.instructions)
+
+        def run_block():
+            if regs.instr + length > regs.limit:
+                return step()
+            for effect in body:
+                effect()
+            next_ip = last()
+            regs.tick += ticks
+            regs.instr += length
+            return ops[next_ip]
+
+        return run_block
+
+    def compile_effect(self, ip: int):
+        """Closure performing the instruction at `ip` and returning the address of the next one."""
+        opcode, addr_type, arg = command_from_hex(f"{self.memory[ip]:08X}")
+
+        if opcode in ALU_FUNCTIONS and addr_type is not None:
+            return self.compile_alu(ip, opcode, addr_type, arg)
+        if opcode in {Opcode.INC, Opcode.DEC} and addr_type is not None:
+            return self.compile_increment(ip, opcode, addr_type, arg)
+        if opcode is Opcode.LOAD and addr_type is not None:
+            return self.compile_load(ip, addr_type, arg)
+        if opcode is Opcode.SAVE and addr_type is not None and addr_type is not AddressingType.OPERAND_LOAD:
+            return self.compile_save(ip, addr_type, arg)
+        if opcode in {Opcode.JMP, Opcode.JZ, Opcode.JNZ, Opcode.CALL, Opcode.RETURN, Opcode.HLT}:
+            return self.compile_control_flow(ip, opcode, arg)
+        if opcode in {Opcode.PUSH, Opcode.POP, Opcode.PRINT, Opcode.PRINTS, Opcode.INPUT}:
+            return self.compile_no_address(ip, opcode)
+
+        return self.compile_fallback(ip)
+
+    def compile_address_selection(self, addr_type: AddressingType, arg: int):
+        regs, memory, write = self.regs, self.memory, self.write
+
+        if addr_type is AddressingType.DIRECT:
+
+            def select_direct():
+                regs.ar = arg
+                return arg
+
+            return select_direct
+
+        if addr_type is AddressingType.INDIRECT:
+
+            def select_indirect():
+                regs.ar = regs.alu = addr = memory[arg]
+                return addr
+
+            return select_indirect
+
+        if addr_type in POST_INDEXED:
+            step = POST_INDEXED[addr_type]
+
+            def select_post_indexed():
+                regs.ar = regs.alu = addr = memory[arg]
+                write(arg, (addr + step) & WORD_MASK)
+                return addr
+
+            return select_post_indexed
+
+        def select_sp_indirect():
+            regs.ar = regs.alu = addr = (regs.sp + arg) & WORD_MASK
+            return addr
+
+        return select_sp_indirect
+
+    def compile_alu(self, ip: int, opcode: Opcode, addr_type: AddressingType, arg: int):
+        regs, memory = self.regs, self.memory
+        function = ALU_FUNCTIONS[opcode]
+        next_ip = ip + 1
+
+        if addr_type is AddressingType.OPERAND_LOAD and opcode is Opcode.CMP:
+
+            def compare_operand():
+                regs.alu = function(regs.acc, arg) & WORD_MASK
+                return next_ip
+
+            return compare_operand
+
+        if addr_type is AddressingType.OPERAND_LOAD:
+
+            def alu_operand():
+                regs.acc = regs.alu = function(regs.acc, arg) & WORD_MASK
+                return next_ip
+
+            return alu_operand
+
+        select = self.compile_address_selection(addr_type, arg)
+
+        if opcode is Opcode.CMP:
+
+            def compare():
+                regs.alu = function(regs.acc, memory[select()]) & WORD_MASK
+                return next_ip
+
+            return compare
+
+        def alu():
+            regs.acc = regs.alu = function(regs.acc, memory[select()]) & WORD_MASK
+            return next_ip
+
+        return alu
+
+    def compile_increment(self, ip: int, opcode: Opcode, addr_type: AddressingType, arg: int):
+        regs, memory, write = self.regs, self.memory, self.write
+        select = self.compile_address_selection(addr_type, arg)
+        step = 1 if opcode is Opcode.INC else -1
+        next_ip = ip + 1
+
+        def increment():
+            addr = select()
+            regs.acc = regs.alu = value = (memory[addr] + step) & WORD_MASK
+            write(addr, value)
+            return next_ip
+
+        return increment
+
+    def compile_load(self, ip: int, addr_type: AddressingType, arg: int):
+        regs, memory = self.regs, self.memory
+        next_ip = ip + 1
+
+        if addr_type is AddressingType.OPERAND_LOAD:
+            value = arg & WORD_MASK
+
+            def load_operand():
+                regs.acc = regs.alu = value
+                return next_ip
+
+            return load_operand
+
+        select = self.compile_address_selection(addr_type, arg)
+
+        def load():
+            regs.acc = regs.alu = memory[select()]
+            return next_ip
+
+        return load
+
+    def compile_save(self, ip: int, addr_type: AddressingType, arg: int):
+        regs, write = self.regs, self.write
+        select = self.compile_address_selection(addr_type, arg)
+        next_ip = ip + 1
+
+        def save():
+            write(select(), regs.acc)
+            return next_ip
+
+        return save
+
+    def compile_control_flow(self, ip: int, opcode: Opcode, arg: int):
+        regs, memory, write = self.regs, self.memory, self.write
+        next_ip = ip + 1
+
+        if opcode is Opcode.JMP:
+            return lambda: arg
+
+        if opcode is Opcode.JZ:
+            return lambda: arg if regs.alu == 0 else next_ip
+
+        if opcode is Opcode.JNZ:
+            return lambda: next_ip if regs.alu == 0 else arg
+
+        if opcode is Opcode.CALL:
+
+            def call():
+                regs.sp -= 1
+                write(regs.sp, next_ip)
+                return arg
+
+            return call
+
+        if opcode is Opcode.RETURN:
+
+            def ret():
+                regs.alu = return_ip = memory[regs.sp]
+                regs.sp += 1
+                return return_ip
+
+            return ret
+
+        def hlt():
+            raise StopIteration()
+
+        return hlt
+
+    def compile_no_address(self, ip: int, opcode: Opcode):
+        regs, memory, write, data_path = self.regs, self.memory, self.write, self.data_path
+        next_ip = ip + 1
+
+        if opcode is Opcode.PUSH:
+
+            def push():
+                regs.sp -= 1
+                write(regs.sp, regs.acc)
+                return next_ip
+
+            return push
+
+        if opcode is Opcode.POP:
+
+            def pop():
+                regs.sp += 1
+                return next_ip
+
+            return pop
+
+        if opcode is Opcode.PRINT:
+
+            def output():
+                data_path.output_buffer.append(chr(regs.acc))
+                return next_ip
+
+            return output
+
+        if opcode is Opcode.PRINTS:
+
+            def output_string():
+                addr = regs.acc
+                while memory[addr]:
+                    data_path.output_buffer.append(chr(memory[addr]))
+                    addr += 1
+                regs.tick += addr - regs.acc + 1
+                regs.ar, regs.acc, regs.alu = addr, 0, 0
+                return next_ip
+
+            return output_string
+
+        def read():
+            if regs.input_pos >= len(data_path.input_buffer):
+                raise EOFError()
+            regs.acc = ord(data_path.input_buffer[regs.input_pos])
+            regs.input_pos += 1
+            return next_ip
+
+        return read
+
+    def compile_fallback(self, ip: int):
+        """Executes an unusual instruction with ControlUnit on a synchronised DataPath."""
+
+        def fallback():
+            self.sync_data_path(ip)
+            try:
+                ControlUnit(self.data_path).decode_and_execute_instruction()
+            finally:
+                self.load_data_path()
+            return self.data_path.ip
+
+        return fallback
+
+    def sync_data_path(self, ip: int) -> None:
+        data_path, regs = self.data_path, self.regs
+
+        data_path.acc, data_path.alu, data_path.ar, data_path.sp = regs.acc, regs.alu, regs.ar, regs.sp
+        data_path.ip = ip
+        data_path.memory[:] = [f"{word:08X}" for word in self.memory]
+        del data_path.input_buffer[: regs.input_pos]
+        regs.input_pos = 0
+
+    def load_data_path(self) -> None:
+        data_path, regs = self.data_path, self.regs
+
+        regs.acc, regs.alu, regs.ar, regs.sp = data_path.acc, data_path.alu, data_path.ar, data_path.sp
+        for addr, word in enumerate(data_path.memory):
+            value = int(word, 16)
+            if value != self.memory[addr]:
+                self.write(addr, value)
+
+    def run(self, limit: int) -> None:
+        regs = self.regs
+        regs.limit = limit
+        op = self.ops[self.data_path.ip]
+
+        try:
+            while regs.instr < limit:
+                op = op()
+        finally:
+            self.sync_data_path(self.addr_of[op])
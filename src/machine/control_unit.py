@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from src.isa import command_from_hex, hex_to_mnemonic
+from src.isa import POST_INDEXED, AddressingType, Opcode, command_from_hex, hex_to_mnemonic
 from src.machine.data_path import (
     AccSelSignal,
     ArSelSignal,
@@ -12,7 +12,43 @@ from src.machine.data_path import (
     RightOperandSelSignal,
     SpSelSignal,
 )
-from src.translator.translator import AddressingType, Opcode
+
+ADDRESSING_TICKS = {
+    AddressingType.DIRECT: 1,
+    AddressingType.INDIRECT: 3,
+    AddressingType.SP_INDIRECT: 2,
+    AddressingType.OPERAND_LOAD: 0,
+    AddressingType.POST_INCREMENT: 4,
+    AddressingType.POST_DECREMENT: 4,
+}
+
+INSTRUCTION_TICKS = {
+    Opcode.JMP: 1,
+    Opcode.JZ: 1,
+    Opcode.JNZ: 1,
+    Opcode.CALL: 2,
+    Opcode.RETURN: 2,
+    Opcode.PUSH: 2,
+    Opcode.POP: 1,
+    Opcode.PRINT: 1,
+    Opcode.PRINTS: 2,
+    Opcode.INPUT: 1,
+    Opcode.HLT: 0,
+}
+
+
+def instruction_ticks(opcode: Opcode, addr_type: AddressingType | None) -> int:
+    """Ticks ControlUnit spends on one instruction; addressing ones pay for operand fetch.
+
+    PRINTS additionally takes a tick per word it reads, the terminating NUL included.
+    """
+    if opcode in INSTRUCTION_TICKS:
+        return INSTRUCTION_TICKS[opcode]
+    if addr_type is None:
+        return 1
+    if opcode is Opcode.INC or opcode is Opcode.DEC:
+        return ADDRESSING_TICKS[addr_type] + 2
+    return ADDRESSING_TICKS[addr_type] + 1
 
 
 class ControlUnit:
@@ -38,6 +74,13 @@ class ControlUnit:
                 self.data_path.latch_instr_ptr(IpSelSignal.INC)
             self.tick()
 
+        elif opcode is Opcode.JNZ:
+            if self.data_path.zero():
+                self.data_path.latch_instr_ptr(IpSelSignal.INC)
+            else:
+                self.data_path.latch_instr_ptr(IpSelSignal.CU, addr)
+            self.tick()
+
         elif opcode is Opcode.CALL:
             self.data_path.latch_instr_ptr(IpSelSignal.INC)
             self.data_path.latch_stack_ptr(SpSelSignal.DEC)
@@ -84,11 +127,64 @@ class ControlUnit:
             self.data_path.latch_addr_reg(ArSelSignal.ALU)
             self.tick()
 
+        elif addr_type in POST_INDEXED:
+            self.data_path.latch_addr_reg(ArSelSignal.CU, addr)
+            self.tick()
+
+            self.data_path.signal_alu_perform(LeftOperandSelSignal.NULL, RightOperandSelSignal.AR_MEM, Opcode.ADD)
+            self.tick()
+
+            if addr_type is AddressingType.POST_INCREMENT:
+                self.data_path.signal_wr(MemDataSelSignal.ALU_INC, MemAddrSelSignal.AR)
+            else:
+                self.data_path.signal_wr(MemDataSelSignal.ALU_DEC, MemAddrSelSignal.AR)
+            self.tick()
+
+            self.data_path.latch_addr_reg(ArSelSignal.ALU)
+            self.tick()
+
+    def execute_increment_instruction(self, addr_type, opcode, arg):
+        alu_opcode = Opcode.ADD if opcode is Opcode.INC else Opcode.SUB
+
+        self.process_address_selection(addr_type, arg)
+        self.data_path.signal_alu_perform(LeftOperandSelSignal.AR_MEM, RightOperandSelSignal.CU, alu_opcode, 1)
+        self.data_path.latch_acc(AccSelSignal.ALU)
+        self.tick()
+
+        self.data_path.signal_wr(MemDataSelSignal.ACC, MemAddrSelSignal.AR)
+
+    def execute_print_string_instruction(self):
+        self.data_path.signal_alu_perform(LeftOperandSelSignal.ACC, RightOperandSelSignal.NULL, Opcode.ADD)
+        self.data_path.latch_addr_reg(ArSelSignal.ALU)
+        self.tick()
+
+        while True:
+            self.data_path.signal_alu_perform(LeftOperandSelSignal.NULL, RightOperandSelSignal.AR_MEM, Opcode.ADD)
+            self.data_path.latch_acc(AccSelSignal.ALU)
+            self.tick()
+
+            if self.data_path.zero():
+                break
+
+            self.data_path.signal_output()
+            self.data_path.latch_addr_reg(ArSelSignal.INC)
+
     def decode_and_execute_instruction(self):
         instr = self.data_path.memory[self.data_path.ip]
         opcode, addr_type, arg = command_from_hex(instr)
+        metrics = self.data_path.metrics
 
-        if opcode in {Opcode.JMP, Opcode.JZ, Opcode.CALL, Opcode.RETURN, Opcode.HLT}:
+        if metrics is None:
+            self.execute_instruction(opcode, addr_type, arg)
+            return
+
+        metrics.read(self.data_path.ip)
+        start_tick = self._tick
+        self.execute_instruction(opcode, addr_type, arg)
+        metrics.instruction(opcode, addr_type, self._tick - start_tick)
+
+    def execute_instruction(self, opcode, addr_type, arg):
+        if opcode in {Opcode.JMP, Opcode.JZ, Opcode.JNZ, Opcode.CALL, Opcode.RETURN, Opcode.HLT}:
             self.execute_control_flow_instruction(opcode, arg)
             return
 
@@ -98,6 +194,9 @@ class ControlUnit:
             if opcode is not Opcode.CMP:
                 self.data_path.latch_acc(AccSelSignal.ALU)
 
+        if opcode is Opcode.INC or opcode is Opcode.DEC:
+            self.execute_increment_instruction(addr_type, opcode, arg)
+
         if opcode is Opcode.LOAD:
             if addr_type is AddressingType.OPERAND_LOAD:
                 self.data_path.signal_alu_perform(LeftOperandSelSignal.NULL, RightOperandSelSignal.CU, Opcode.ADD, arg)
@@ -114,6 +213,9 @@ class ControlUnit:
         if opcode is Opcode.PRINT:
             self.data_path.signal_output()
 
+        if opcode is Opcode.PRINTS:
+            self.execute_print_string_instruction()
+
         if opcode is Opcode.INPUT:
             self.data_path.latch_acc(AccSelSignal.IN)
 
@@ -3,7 +3,9 @@ from __future__ import annotations
 import logging
 from enum import Enum
 
-from src.translator.translator import Opcode
+from src.isa import SIGN_BIT, WORD_MASK, Opcode
+
+MEMORY_SIZE = 2048
 
 
 class AccSelSignal(Enum):
@@ -14,6 +16,7 @@ class AccSelSignal(Enum):
 class ArSelSignal(Enum):
     ALU = 0
     CU = 1
+    INC = 2
 
 
 class IpSelSignal(Enum):
@@ -30,6 +33,8 @@ class SpSelSignal(Enum):
 class MemDataSelSignal(Enum):
     ACC = 0
     IP = 1
+    ALU_INC = 2
+    ALU_DEC = 3
 
 
 class MemAddrSelSignal(Enum):
@@ -41,6 +46,7 @@ class LeftOperandSelSignal(Enum):
     NULL = 0
     ACC = 1
     SP = 2
+    AR_MEM = 3
 
 
 class RightOperandSelSignal(Enum):
@@ -51,19 +57,22 @@ class RightOperandSelSignal(Enum):
 
 
 class DataPath:
-    def __init__(self, memory, input_buffer):
-        self.memory_size = 2048
+    def __init__(self, memory, input_buffer, metrics=None):
+        self.memory_size = MEMORY_SIZE
         self.memory = memory
-        self.memory.extend(["00000000"] * (2048 - len(memory)))
+        self.memory.extend(["00000000"] * (MEMORY_SIZE - len(memory)))
 
         self.acc = 0
         self.sp = self.memory_size
         self.ip = 0
         self.ar = 0
         self.alu = 0
+        self.carry_flag = False
+        self.overflow_flag = False
 
         self.input_buffer = input_buffer
         self.output_buffer = []
+        self.metrics = metrics
 
     def latch_acc(self, sel: AccSelSignal) -> None:
         if sel == AccSelSignal.ALU:
@@ -73,6 +82,8 @@ class DataPath:
             if len(self.input_buffer) == 0:
                 raise EOFError()
             self.acc = ord(self.input_buffer.pop(0))
+            if self.metrics is not None:
+                self.metrics.input_count += 1
 
     def latch_addr_reg(self, sel: ArSelSignal, addr: int | None = None) -> None:
         if sel is ArSelSignal.ALU:
@@ -81,6 +92,9 @@ class DataPath:
         elif sel is ArSelSignal.CU:
             self.ar = addr
 
+        elif sel is ArSelSignal.INC:
+            self.ar += 1
+
     def latch_instr_ptr(self, sel: IpSelSignal, addr: int | None = None) -> None:
         if sel == IpSelSignal.INC:
             self.ip += 1
@@ -97,20 +111,37 @@ class DataPath:
 
         elif sel == SpSelSignal.DEC:
             self.sp -= 1
+            if self.metrics is not None:
+                self.metrics.stack_pointer(self.sp)
 
     def signal_wr(self, data_sel: MemDataSelSignal, addr_sel: MemAddrSelSignal):
         addr = self.ar if addr_sel == MemAddrSelSignal.AR else self.sp
+        if self.metrics is not None:
+            self.metrics.write(addr)
 
         if data_sel == MemDataSelSignal.ACC:
-            self.memory[addr] = f"{self.acc:X}".zfill(8)
+            self.memory[addr] = f"{self.acc:08X}"
 
         elif data_sel == MemDataSelSignal.IP:
-            self.memory[addr] = f"{self.ip:X}".zfill(8)
+            self.memory[addr] = f"{self.ip:08X}"
+
+        elif data_sel == MemDataSelSignal.ALU_INC:
+            self.memory[addr] = f"{(self.alu + 1) & WORD_MASK:08X}"
+
+        elif data_sel == MemDataSelSignal.ALU_DEC:
+            self.memory[addr] = f"{(self.alu - 1) & WORD_MASK:08X}"
 
     def signal_output(self):
         symbol = chr(self.acc)
         logging.debug("output: %s << %s", repr("".join(self.output_buffer)), repr(symbol))
         self.output_buffer.append(symbol)
+        if self.metrics is not None:
+            self.metrics.output_count += 1
+
+    def read(self, addr: int) -> int:
+        if self.metrics is not None:
+            self.metrics.read(addr)
+        return int(self.memory[addr], 16)
 
     def get_left_operand(self, sel: LeftOperandSelSignal) -> int:
         if sel is LeftOperandSelSignal.SP:
@@ -119,13 +150,15 @@ class DataPath:
             return 0
         if sel is LeftOperandSelSignal.ACC:
             return self.acc
+        if sel is LeftOperandSelSignal.AR_MEM:
+            return self.read(self.ar)
         return -1
 
     def get_right_operand(self, sel: RightOperandSelSignal, operand: int = -1) -> int:
         if sel is RightOperandSelSignal.AR_MEM:
-            return int(self.memory[self.ar], 16)
+            return self.read(self.ar)
         if sel is RightOperandSelSignal.SP_MEM:
-            return int(self.memory[self.sp], 16)
+            return self.read(self.sp)
         if sel is RightOperandSelSignal.NULL:
             return 0
         if sel is RightOperandSelSignal.CU:
@@ -143,13 +176,33 @@ class DataPath:
         right_operand = self.get_right_operand(right_operand_sel, operand)
 
         if opcode is Opcode.ADD:
-            self.alu = left_operand + right_operand
+            result = left_operand + right_operand
+            self.alu = result & WORD_MASK
+            self.carry_flag = result > WORD_MASK
+            self.overflow_flag = (left_operand ^ self.alu) & (right_operand ^ self.alu) & SIGN_BIT != 0
+
         elif opcode is Opcode.SUB or opcode is Opcode.CMP:
-            self.alu = left_operand - right_operand
+            result = left_operand - right_operand
+            self.alu = result & WORD_MASK
+            self.carry_flag = result < 0
+            self.overflow_flag = (left_operand ^ right_operand) & (left_operand ^ self.alu) & SIGN_BIT != 0
+
         elif opcode is Opcode.DIV:
             self.alu = left_operand // right_operand
+            self.carry_flag = self.overflow_flag = False
+
         elif opcode is Opcode.MOD:
             self.alu = left_operand % right_operand
+            self.carry_flag = self.overflow_flag = False
 
     def zero(self):
         return self.alu == 0
+
+    def negative(self):
+        return self.alu & SIGN_BIT != 0
+
+    def carry(self):
+        return self.carry_flag
+
+    def overflow(self):
+        return self.overflow_flag
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+
+from src.isa import Opcode
+from src.machine.control_unit import ControlUnit
+from src.machine.data_path import AccSelSignal, MemAddrSelSignal
+
+# handler arguments:
+# fetch(ip, word) - before an instruction runs, `word` is its hex memory word
+# read(addr, value), write(addr, value) - memory accesses of DataPath, values as integers
+# io(direction, char) - "in" after INPUT, "out" for every character PRINT and PRINTS output
+# call(target, return_addr), return(return_addr) - after CALL and RETURN
+EVENTS = ("fetch", "read", "write", "io", "call", "return")
+
+
+class Hooks:
+    """Observers of the interpreter engine, registered by event with `on`.
+
+    `simulation(..., hooks=hooks)` calls `install`, which replaces the ControlUnit and DataPath
+    methods raising the events in use with wrappers on those instances only. Methods of unused
+    events, and everything when no hooks are registered, stay the plain class methods, so
+    instrumentation costs nothing unless it is used.
+    """
+
+    def __init__(self):
+        self.handlers: dict[str, list[Callable]] = {event: [] for event in EVENTS}
+
+    def on(self, event: str, handler: Callable) -> Callable:
+        assert event in EVENTS, f"Unknown event: {event}, expected one of {EVENTS}"
+        self.handlers[event].append(handler)
+        return handler
+
+    def events(self) -> set[str]:
+        return {event for event, handlers in self.handlers.items() if handlers}
+
+    def emitter(self, event: str) -> Callable:
+        handlers = self.handlers[event]
+        if len(handlers) == 1:
+            return handlers[0]
+
+        def emit(*args):
+            for handler in handlers:
+                handler(*args)
+
+        return emit
+
+    def install(self, control_unit: ControlUnit) -> None:
+        events = self.events()
+        data_path = control_unit.data_path
+
+        if "fetch" in events:
+            fetch, decode_and_execute = self.emitter("fetch"), control_unit.decode_and_execute_instruction
+
+            def decode_and_execute_instruction():
+                fetch(data_path.ip, data_path.memory[data_path.ip])
+                decode_and_execute()
+
+            control_unit.decode_and_execute_instruction = decode_and_execute_instruction  # type: ignore[method-assign]
+
+        if "read" in events:
+            on_read, read = self.emitter("read"), data_path.read
+
+            def hooked_read(addr):
+                value = read(addr)
+                on_read(addr, value)
+                return value
+
+            data_path.read = hooked_read  # type: ignore[method-assign]
+
+        if "write" in events:
+            on_write, signal_wr = self.emitter("write"), data_path.signal_wr
+
+            def hooked_signal_wr(data_sel, addr_sel):
+                signal_wr(data_sel, addr_sel)
+                addr = data_path.ar if addr_sel == MemAddrSelSignal.AR else data_path.sp
+                on_write(addr, int(data_path.memory[addr], 16))
+
+            data_path.signal_wr = hooked_signal_wr  # type: ignore[method-assign]
+
+        if "io" in events:
+            self.install_io(control_unit)
+
+        if "call" in events or "return" in events:
+            self.install_control_flow(control_unit)
+
+    def install_io(self, control_unit: ControlUnit) -> None:
+        data_path = control_unit.data_path
+        on_io, latch_acc, signal_output = self.emitter("io"), data_path.latch_acc, data_path.signal_output
+
+        def hooked_latch_acc(sel):
+            latch_acc(sel)
+            if sel == AccSelSignal.IN:
+                on_io("in", chr(data_path.acc))
+
+        def hooked_signal_output():
+            signal_output()
+            on_io("out", data_path.output_buffer[-1])
+
+        data_path.latch_acc = hooked_latch_acc  # type: ignore[method-assign]
+        data_path.signal_output = hooked_signal_output  # type: ignore[method-assign]
+
+    def install_control_flow(self, control_unit: ControlUnit) -> None:
+        data_path = control_unit.data_path
+        on_call = self.emitter("call") if self.handlers["call"] else None
+        on_return = self.emitter("return") if self.handlers["return"] else None
+        execute = control_unit.execute_control_flow_instruction
+
+        def hooked_execute(opcode, addr):
+            execute(opcode, addr)
+            if opcode is Opcode.CALL and on_call is not None:
+                on_call(data_path.ip, int(data_path.memory[data_path.sp], 16))
+            elif opcode is Opcode.RETURN and on_return is not None:
+                on_return(data_path.ip)
+
+        control_unit.execute_control_flow_instruction = hooked_execute  # type: ignore[method-assign]
@@ -1,36 +1,227 @@
+import asyncio
+import codecs
+import json
 import logging
 import pickle
 import sys
 
+from src.machine.closure_engine import ClosureEngine
 from src.machine.control_unit import ControlUnit
 from src.machine.data_path import DataPath
+from src.machine.hooks import Hooks
+from src.machine.metrics import Metrics
+from src.machine.result_cache import ResultCache, result_key
+from src.machine.timing import TimingModel
+from src.machine.trace import RingTrace, StreamTrace, TraceRecorder
+from src.machine.tracing_jit import TracingJit
 
+ENGINES = ("interpreter", "closure", "jit")
 
-def simulation(memory, input_tokens, limit):
-    data_path = DataPath(memory, input_tokens)
+HALTED, INPUT_EMPTY, LIMIT_EXCEEDED = "halted", "input empty", "limit exceeded"
+TERMINATION_WARNINGS = {INPUT_EMPTY: "Input buffer is empty!", LIMIT_EXCEEDED: "Limit exceeded!"}
+CLI_FLAGS = {
+    "--cache",
+    "--clear-cache",
+    "--cache-stats",
+    "--metrics",
+    "--limit",
+    "--trace",
+    "--trace-last",
+    "--timing",
+}
+
+SLICE_SIZE = 1000
+INPUT_CHUNK_SIZE = 4096
+
+
+def simulation(
+    memory,
+    input_tokens,
+    limit,
+    engine="interpreter",
+    with_termination=False,
+    metrics: Metrics | None = None,
+    trace: TraceRecorder | None = None,
+    hooks: Hooks | None = None,
+    timing: TimingModel | None = None,
+):
+    """Returns output, instruction and tick counters, followed by the termination reason (HALTED,
+    INPUT_EMPTY or LIMIT_EXCEEDED) if `with_termination` is set.
+    `memory` is left holding the final memory of the machine, whatever the engine.
+
+    `metrics`, created from the image before the run, is filled in by the interpreter engine.
+    With `trace` the interpreter records every instruction into it instead of the debug log.
+    `hooks` are installed into the interpreter engine before the run. With `timing` the interpreter
+    adds memory stall ticks of the model to the tick counter.
+    """
+    assert engine in ENGINES, f"Unknown engine: {engine}, expected one of {ENGINES}"
+    assert metrics is None or engine == "interpreter", "Metrics are collected by the interpreter engine only"
+    assert trace is None or engine == "interpreter", "Traces are recorded by the interpreter engine only"
+    assert hooks is None or engine == "interpreter", "Hooks are run by the interpreter engine only"
+    assert timing is None or engine == "interpreter", "Timing is modelled by the interpreter engine only"
+
+    data_path = DataPath(memory, input_tokens, metrics)
     control_unit = ControlUnit(data_path)
+    closure_engine = ClosureEngine(data_path) if engine == "closure" else None
+    tracing_jit = TracingJit(control_unit) if engine == "jit" else None
     instr_counter = 0
+    termination = HALTED
+
+    if timing is not None:
+        timing.hooks(control_unit).install(control_unit)
+    if hooks is not None:
+        hooks.install(control_unit)
 
-    logging.debug("%s", control_unit)
     try:
-        while instr_counter < limit:
-            control_unit.decode_and_execute_instruction()
-            instr_counter += 1
+        if closure_engine is not None:
+            closure_engine.run(limit)
+        elif tracing_jit is not None:
+            tracing_jit.run(limit)
+        elif trace is not None:
+            trace.start(control_unit)
+            while instr_counter < limit:
+                word = data_path.memory[data_path.ip]
+                control_unit.decode_and_execute_instruction()
+                instr_counter += 1
+                trace.record(word)
+        else:
             logging.debug("%s", control_unit)
+            while instr_counter < limit:
+                control_unit.decode_and_execute_instruction()
+                instr_counter += 1
+                logging.debug("%s", control_unit)
 
     except EOFError:
-        logging.warning("Input buffer is empty!")
+        termination = INPUT_EMPTY
 
     except StopIteration:
         pass
 
+    if closure_engine is not None:
+        instr_counter, control_unit._tick = closure_engine.instr_counter, closure_engine.tick_counter
+        data_path.memory[:] = [f"{word:08X}" for word in closure_engine.memory]
+    elif tracing_jit is not None:
+        instr_counter = tracing_jit.instr_counter
+
     if instr_counter >= limit:
-        logging.warning("Limit exceeded!")
+        termination = LIMIT_EXCEEDED
 
+    if termination in TERMINATION_WARNINGS:
+        logging.warning(TERMINATION_WARNINGS[termination])
+
+    if with_termination:
+        return "".join(data_path.output_buffer), instr_counter, control_unit._tick, termination
     return "".join(data_path.output_buffer), instr_counter, control_unit._tick
 
 
-def main(bin_code_file, input_file):
+def cached_simulation(memory, input_tokens, limit, cache: ResultCache, engine="interpreter"):
+    """`simulation` answered from `cache` when the same image already ran on the same input and limit.
+
+    A hit repeats the termination warning but not the per-instruction debug log. The simulation
+    runs on copies, so `memory` and `input_tokens` are left as they were, hit or miss.
+    """
+    key = result_key(memory, input_tokens, limit)
+    result = cache.get(key)
+
+    if result is None:
+        result = simulation(list(memory), list(input_tokens), limit, engine, with_termination=True)
+        cache.put(key, result)
+    else:
+        logging.info("Result cache hit: %s", key)
+        if result[3] in TERMINATION_WARNINGS:
+            logging.warning(TERMINATION_WARNINGS[result[3]])
+
+    output, instr_counter, ticks, _ = result
+    return output, instr_counter, ticks
+
+
+async def write_output(writer, output_buffer: list[str], written: int) -> int:
+    """Writes the output after the first `written` characters, returns the number written in total."""
+    if writer is not None and written < len(output_buffer):
+        writer.write("".join(output_buffer[written:]).encode("utf-8"))
+        await writer.drain()
+    return len(output_buffer)
+
+
+async def async_simulation(
+    memory, reader: asyncio.StreamReader, limit, engine="interpreter", writer=None, slice_size=SLICE_SIZE
+):
+    """`simulation` reading input from `reader` as it arrives.
+
+    The machine runs in slices of `slice_size` instructions and yields to the event loop after
+    each one. INPUT with no input buffered suspends until `reader` gives more bytes; they are
+    decoded as UTF-8 and the end of the stream is read as a single "\\0", like the end of an input
+    file in `main`. Output produced so far is written to `writer` (an asyncio.StreamWriter, if
+    given) before suspending and after every slice. Instructions aren't logged.
+    """
+    assert engine in ENGINES, f"Unknown engine: {engine}, expected one of {ENGINES}"
+
+    data_path = DataPath(memory, [])
+    control_unit = ControlUnit(data_path)
+    closure_engine = ClosureEngine(data_path) if engine == "closure" else None
+    tracing_jit = TracingJit(control_unit) if engine == "jit" else None
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    instr_counter = written = 0
+    termination = LIMIT_EXCEEDED
+    input_closed = False
+
+    while instr_counter < limit:
+        try:
+            slice_limit = min(limit, instr_counter + slice_size)
+            if closure_engine is not None:
+                closure_engine.run(slice_limit)
+            elif tracing_jit is not None:
+                tracing_jit.run(slice_limit)
+            else:
+                while instr_counter < slice_limit:
+                    control_unit.decode_and_execute_instruction()
+                    instr_counter += 1
+            input_needed = False
+
+        except EOFError:
+            input_needed = True
+
+        except StopIteration:
+            termination = HALTED
+            break
+
+        finally:
+            if closure_engine is not None:
+                instr_counter = closure_engine.instr_counter
+            elif tracing_jit is not None:
+                instr_counter = tracing_jit.instr_counter
+
+        written = await write_output(writer, data_path.output_buffer, written)
+
+        if not input_needed:
+            await asyncio.sleep(0)
+        elif input_closed:
+            termination = INPUT_EMPTY
+            break
+        else:
+            data = await reader.read(INPUT_CHUNK_SIZE)
+            input_closed = not data
+            data_path.input_buffer.extend(decoder.decode(data, final=input_closed) + ("\0" if input_closed else ""))
+
+    if termination in TERMINATION_WARNINGS:
+        logging.warning(TERMINATION_WARNINGS[termination])
+
+    await write_output(writer, data_path.output_buffer, written)
+
+    ticks = closure_engine.tick_counter if closure_engine is not None else control_unit._tick
+    return "".join(data_path.output_buffer), instr_counter, ticks
+
+
+def main(
+    bin_code_file,
+    input_file,
+    engine="interpreter",
+    cache: ResultCache | None = None,
+    with_metrics=False,
+    trace: TraceRecorder | None = None,
+    limit=1000,
+    timing_config: dict | None = None,
+):
     with open(bin_code_file, "rb") as f:
         memory = pickle.load(f)
 
@@ -41,14 +232,75 @@ def main(bin_code_file, input_file):
             input_token.append(char)
         input_token.append("\0")
 
-    output, instr_counter, ticks = simulation(memory, input_token, limit=1000)
+    metrics = Metrics(memory) if with_metrics else None
+    timing = TimingModel.from_json(memory, timing_config) if timing_config is not None else None
+
+    if cache is None or metrics is not None or trace is not None or timing is not None:
+        output, instr_counter, ticks = simulation(
+            memory, input_token, limit, engine, metrics=metrics, trace=trace, timing=timing
+        )
+    else:
+        output, instr_counter, ticks = cached_simulation(memory, input_token, limit, cache, engine)
 
     print(output)
     print(f"instr_counter: {instr_counter}, ticks: {ticks}")
+    if metrics is not None:
+        print(json.dumps(metrics.to_json()))
+    if timing is not None:
+        print(json.dumps(timing.to_json()))
 
 
 if __name__ == "__main__":
     logging.getLogger().setLevel(logging.DEBUG)
-    assert len(sys.argv) == 3, "Wrong arguments: machine.py <binary_code_file> <input_file>"
-    _, code_file, input_file = sys.argv
-    main(code_file, input_file)
+    flags = dict(arg.partition("=")[::2] for arg in sys.argv[1:] if arg.startswith("--"))
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    usage = (
+        "machine.py [--cache] [--clear-cache] [--cache-stats] [--metrics] [--limit=<n>]"
+        " [--trace=<trace_file> [--trace-last=<n>]] [--timing[=<config_file>]] <binary_code_file> <input_file> [engine]"
+    )
+    assert flags.keys() <= CLI_FLAGS, f"Unknown flags: {flags.keys() - CLI_FLAGS}, usage: {usage}"
+
+    if "--clear-cache" in flags:
+        ResultCache().clear()
+
+    if args or not flags:
+        assert len(args) in (2, 3), f"Wrong arguments: {usage}"
+        engine = args[2] if len(args) == 3 else "interpreter"
+        cache = ResultCache() if "--cache" in flags else None
+
+        trace: TraceRecorder | None = None
+        if "--trace-last" in flags:
+            assert "--trace" in flags, f"--trace-last needs --trace, usage: {usage}"
+            trace = RingTrace(int(flags["--trace-last"]))
+        elif "--trace" in flags:
+            trace = StreamTrace(flags["--trace"])
+        if trace is not None:
+            logging.getLogger().setLevel(logging.INFO)
+
+        timing_config = None
+        if flags.get("--timing"):
+            with open(flags["--timing"], encoding="utf-8") as f:
+                timing_config = json.load(f)
+        elif "--timing" in flags:
+            timing_config = {}
+
+        try:
+            main(
+                args[0],
+                args[1],
+                engine,
+                cache,
+                "--metrics" in flags,
+                trace,
+                int(flags.get("--limit", 1000)),
+                timing_config,
+            )
+        finally:
+            # the trace of a run that failed is the one most needed
+            if isinstance(trace, RingTrace) and trace.base is not None:
+                trace.dump(flags["--trace"])
+            elif isinstance(trace, StreamTrace):
+                trace.close()
+
+    if "--cache-stats" in flags:
+        print(ResultCache().stats())
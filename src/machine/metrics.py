@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from src.isa import AddressingType, Opcode, command_from_hex
+from src.machine.control_unit import INSTRUCTION_TICKS
+from src.machine.data_path import MEMORY_SIZE
+
+REGIONS = ("code", "data", "stack")
+
+
+def image_layout(image: list[str]) -> tuple[int, int]:
+    """Start addresses of the code and the stack: word 0 jumps to the first instruction, the words
+    between them are data, the rest of the image is code, and memory past the image is the stack."""
+    opcode, _, arg = command_from_hex(image[0])
+    return arg if opcode is Opcode.JMP else 0, len(image)
+
+
+def region(addr: int, code_start: int, stack_start: int) -> str:
+    if addr >= stack_start:
+        return "stack"
+    if addr >= code_start or addr == 0:
+        return "code"
+    return "data"
+
+
+class Metrics:
+    """Counters filled by DataPath and ControlUnit while `simulation` runs the interpreter engine.
+
+    Regions come from the translator's image layout, see `image_layout`. Instruction fetches count
+    as code reads. Per-opcode and per-addressing-mode counters hold executed instructions and the
+    ticks they took; jumps, stack and I/O instructions don't fetch an operand and are counted under
+    addressing mode "NONE". The stack high-water mark is the largest number of words pushed at once.
+    """
+
+    def __init__(self, image: list[str]):
+        self.code_start, self.stack_start = image_layout(image)
+
+        self.reads = dict.fromkeys(REGIONS, 0)
+        self.writes = dict.fromkeys(REGIONS, 0)
+        self.min_sp = MEMORY_SIZE
+        self.opcodes: dict[str, list[int]] = {}
+        self.addressing: dict[str, list[int]] = {}
+        self.input_count = 0
+        self.output_count = 0
+
+    def read(self, addr: int) -> None:
+        self.reads[region(addr, self.code_start, self.stack_start)] += 1
+
+    def write(self, addr: int) -> None:
+        self.writes[region(addr, self.code_start, self.stack_start)] += 1
+
+    def stack_pointer(self, sp: int) -> None:
+        self.min_sp = min(self.min_sp, sp)
+
+    def instruction(self, opcode: Opcode, addr_type: AddressingType | None, ticks: int) -> None:
+        addressing = "NONE" if opcode in INSTRUCTION_TICKS or addr_type is None else addr_type.name
+
+        for counters, key in ((self.opcodes, opcode.name), (self.addressing, addressing)):
+            counter = counters.setdefault(key, [0, 0])
+            counter[0] += 1
+            counter[1] += ticks
+
+    def to_json(self) -> dict:
+        return {
+            "memory": {"reads": self.reads, "writes": self.writes},
+            "stack": {"high_water_mark": MEMORY_SIZE - self.min_sp, "min_sp": self.min_sp},
+            "opcodes": {name: {"count": count, "ticks": ticks} for name, (count, ticks) in self.opcodes.items()},
+            "addressing": {name: {"count": count, "ticks": ticks} for name, (count, ticks) in self.addressing.items()},
+            "io": {"input": self.input_count, "output": self.output_count},
+        }
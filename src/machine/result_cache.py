@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+from pathlib import Path
+
+from src.machine.control_unit import ADDRESSING_TICKS, INSTRUCTION_TICKS
+
+DEFAULT_CACHE_DIR = os.path.join(Path.home(), ".cache", "lisp-machine")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+ENTRY_SUFFIX = ".pickle"
+
+# hits and misses, rewritten in place under an exclusive lock
+COUNTERS_FILE = "counters"
+COUNTERS = ("hits", "misses")
+COUNTERS_FORMAT = struct.Struct("<QQ")
+
+# bumped whenever the simulator or the cached result changes in a way the tick tables don't show
+SIMULATOR_VERSION = 1
+
+
+def simulator_hash() -> str:
+    """Hash of the simulator version and its tick tables, results cached by another one are stale."""
+    tables = [
+        sorted((opcode.name, ticks) for opcode, ticks in INSTRUCTION_TICKS.items()),
+        sorted((addr_type.name, ticks) for addr_type, ticks in ADDRESSING_TICKS.items()),
+    ]
+    return hashlib.sha256(f"{SIMULATOR_VERSION}:{tables}".encode()).hexdigest()
+
+
+def result_key(memory: list[str], input_tokens: list[str], limit: int) -> str:
+    """Hash of the simulator (see `simulator_hash`), a memory image, its input and instruction
+    limit. Memory words have a fixed width, so joining them is unambiguous."""
+    image_hash = hashlib.sha256("".join(memory).encode()).hexdigest()
+    input_hash = hashlib.sha256("".join(input_tokens).encode("utf-8")).hexdigest()
+    return hashlib.sha256(f"{simulator_hash()}:{image_hash}:{input_hash}:{limit}".encode()).hexdigest()
+
+
+class ResultCache:
+    """On-disk cache of simulation results, one pickle file per key.
+
+    A hit refreshes the modification time of its file, and after every store the least recently
+    used files are removed until the total size fits into `max_bytes`. Hits and misses are kept
+    in a fixed-size `counters` file updated under `flock`, so concurrent runs sharing the directory
+    don't lose counts. Results don't depend on the engine, so it isn't part of the key.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def entry_path(self, key: str) -> Path:
+        return self.directory / (key + ENTRY_SUFFIX)
+
+    def open_counters(self, lock: int):
+        """Opens the counters file, creating it, and locks it until closed."""
+        f = os.fdopen(os.open(self.directory / COUNTERS_FILE, os.O_RDWR | os.O_CREAT), "r+b")
+        fcntl.flock(f, lock)
+        return f
+
+    @staticmethod
+    def read_counters(f) -> dict[str, int]:
+        data = f.read(COUNTERS_FORMAT.size)
+        values = COUNTERS_FORMAT.unpack(data) if len(data) == COUNTERS_FORMAT.size else (0,) * len(COUNTERS)
+        return dict(zip(COUNTERS, values))
+
+    def count(self, counter: str) -> None:
+        with self.open_counters(fcntl.LOCK_EX) as f:
+            counters = self.read_counters(f)
+            counters[counter] += 1
+            f.seek(0)
+            f.write(COUNTERS_FORMAT.pack(*counters.values()))
+
+    def get(self, key: str):
+        path = self.entry_path(key)
+
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            path.touch()
+        except (OSError, pickle.UnpicklingError, EOFError):
+            self.count("misses")
+            return None
+
+        self.count("hits")
+        return result
+
+    def put(self, key: str, result) -> None:
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as f:
+            pickle.dump(result, f)
+        Path(f.name).replace(self.entry_path(key))
+
+        self.evict()
+
+    def entries(self) -> list[tuple[float, int, Path]]:
+        entries = []
+        for path in self.directory.glob("*" + ENTRY_SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self) -> None:
+        entries = sorted(self.entries(), key=lambda entry: entry[0])
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def clear(self) -> None:
+        for _, _, path in self.entries():
+            path.unlink(missing_ok=True)
+        (self.directory / COUNTERS_FILE).unlink(missing_ok=True)
+
+    def stats(self) -> dict[str, int]:
+        entries = self.entries()
+        with self.open_counters(fcntl.LOCK_SH) as f:
+            counters = self.read_counters(f)
+
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries), **counters}
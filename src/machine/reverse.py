@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import array
+import collections
+from collections.abc import Callable, Collection
+
+from src.machine.control_unit import ControlUnit
+from src.machine.data_path import DataPath, MemAddrSelSignal
+from src.machine.trace import Reader, put_signed, put_varint
+
+CHECKPOINT_INTERVAL = 10_000
+HISTORY = 100_000
+
+# registers restored by an undo record: a bit per register given as a delta, then writes, input and output
+REGISTERS = ("ip", "ar", "sp", "alu", "acc", "carry_flag", "overflow_flag")
+FLAGS = ("carry_flag", "overflow_flag")
+WRITES, INPUT, OUTPUT = (1 << bit for bit in range(len(REGISTERS), len(REGISTERS) + 3))
+
+
+class InputQueue(collections.deque[str]):
+    """Input of the debugged DataPath: it pops tokens from the front and `undo` puts them back,
+    both in constant time."""
+
+    def pop(self, index: int = -1) -> str:
+        return self.popleft() if index == 0 else super().pop()
+
+
+class Checkpoint:
+    def __init__(self, debugger: ReverseDebugger):
+        data_path = debugger.data_path
+        self.registers = [getattr(data_path, name) for name in REGISTERS]
+        self.tick = debugger.control_unit._tick
+        self.memory = list(data_path.memory)
+        self.output = list(data_path.output_buffer)
+        self.input_len = len(data_path.input_buffer)
+
+    def restore(self, debugger: ReverseDebugger) -> None:
+        data_path = debugger.data_path
+        for name, value in zip(REGISTERS, self.registers):
+            setattr(data_path, name, value)
+        debugger.control_unit._tick = self.tick
+        data_path.memory[:] = self.memory
+        data_path.output_buffer[:] = self.output
+        data_path.input_buffer.clear()
+        data_path.input_buffer.extend(debugger.input_tokens[len(debugger.input_tokens) - self.input_len :])
+
+
+class ReverseDebugger:
+    """Runs the interpreter engine forward and back.
+
+    Every instruction run appends an undo record to a byte log: deltas of the registers and the
+    tick counter it changed, the memory words it overwrote with their old values and whether it
+    read input or wrote output, as varints (see `trace`), so the log grows with the writes rather
+    than with the memory size. A full checkpoint is taken every `checkpoint_interval` instructions;
+    records more than `history` instructions old are dropped up to a checkpoint together with the
+    checkpoints before it, so the debugger keeps at most `history / checkpoint_interval + 1` of them
+    and can go back to the oldest one kept. Going back before the log restores a checkpoint and runs
+    forward again. Input is kept, so a run is repeated exactly.
+
+    `position` is the number of instructions run, `ip` points at the next one.
+    """
+
+    def __init__(
+        self,
+        memory: list[str],
+        input_tokens: list[str],
+        checkpoint_interval: int = CHECKPOINT_INTERVAL,
+        history: int = HISTORY,
+    ):
+        assert history >= checkpoint_interval, "History must hold at least a checkpoint interval"
+        self.input_tokens = list(input_tokens)
+        self.data_path = DataPath(memory, InputQueue(input_tokens))
+        self.control_unit = ControlUnit(self.data_path)
+        self.checkpoint_interval = checkpoint_interval
+        self.history = history
+
+        self.position = 0
+        self.halted = False
+        self.log = bytearray()
+        self.offsets = array.array("Q")
+        self.log_start = 0
+        self.checkpoints = {0: Checkpoint(self)}
+        self.writes: list[tuple[int, int]] = []
+
+        signal_wr = self.data_path.signal_wr
+
+        def recording_signal_wr(data_sel, addr_sel):
+            addr = self.data_path.ar if addr_sel == MemAddrSelSignal.AR else self.data_path.sp
+            self.writes.append((addr, int(self.data_path.memory[addr], 16)))
+            signal_wr(data_sel, addr_sel)
+
+        self.data_path.signal_wr = recording_signal_wr  # type: ignore[method-assign]
+
+    def step(self, count: int = 1, breakpoints: Collection[int] = ()) -> int:
+        """Runs up to `count` instructions, stops before one at a breakpoint after the first one,
+        on halt or when input is over. Returns the number run."""
+        data_path, control_unit = self.data_path, self.control_unit
+
+        for done in range(count):
+            if done > 0 and data_path.ip in breakpoints:
+                return done
+            if self.position % self.checkpoint_interval == 0 and self.position not in self.checkpoints:
+                self.take_checkpoint()
+
+            registers = [getattr(data_path, name) for name in REGISTERS]
+            tick, input_len, output_len = control_unit._tick, len(data_path.input_buffer), len(data_path.output_buffer)
+            self.writes = []
+            try:
+                control_unit.decode_and_execute_instruction()
+            except (StopIteration, EOFError):
+                self.halted = True
+                return done
+
+            self.record(registers, tick, input_len, output_len)
+            self.position += 1
+
+        return count
+
+    def run(self, breakpoints: Collection[int] = (), limit: int | None = None) -> int:
+        """Runs until a breakpoint, halt, the end of input or `limit` instructions."""
+        return self.step(limit if limit is not None else 1 << 62, breakpoints)
+
+    def record(self, registers: list, tick: int, input_len: int, output_len: int) -> None:
+        data_path = self.data_path
+        buf = bytearray()
+        flags = 0
+        deltas = []
+
+        for bit, (name, before) in enumerate(zip(REGISTERS, registers)):
+            delta = before - getattr(data_path, name)
+            if delta:
+                flags |= 1 << bit
+                deltas.append(delta)
+
+        if self.writes:
+            flags |= WRITES
+        if len(data_path.input_buffer) != input_len:
+            flags |= INPUT
+        if len(data_path.output_buffer) != output_len:
+            flags |= OUTPUT
+
+        put_varint(buf, flags)
+        put_varint(buf, self.control_unit._tick - tick)
+        for delta in deltas:
+            put_signed(buf, delta)
+        if self.writes:
+            put_varint(buf, len(self.writes))
+            for addr, old in self.writes:
+                put_varint(buf, addr)
+                put_varint(buf, old)
+        if flags & OUTPUT:
+            put_varint(buf, len(data_path.output_buffer) - output_len)
+
+        self.offsets.append(len(self.log))
+        self.log += buf
+
+    def take_checkpoint(self) -> None:
+        self.checkpoints[self.position] = Checkpoint(self)
+
+        # drop the checkpoints and records before the oldest checkpoint still within `history`
+        start = min(position for position in self.checkpoints if position >= self.position - self.history)
+        for position in [position for position in self.checkpoints if position < start]:
+            del self.checkpoints[position]
+        if start > self.log_start:
+            dropped = start - self.log_start
+            offset = self.offsets[dropped] if dropped < len(self.offsets) else len(self.log)
+            del self.log[:offset]
+            self.offsets = array.array("Q", (record_offset - offset for record_offset in self.offsets[dropped:]))
+            self.log_start = start
+
+    def undo(self) -> list[int]:
+        """Undoes the last instruction in the log, returns the addresses it had written."""
+        data_path = self.data_path
+        offset = self.offsets.pop()
+        reader = Reader(bytes(self.log[offset:]))
+        del self.log[offset:]
+
+        flags = reader.varint()
+        self.control_unit._tick -= reader.varint()
+        for bit, name in enumerate(REGISTERS):
+            if flags & 1 << bit:
+                value = getattr(data_path, name) + reader.signed()
+                setattr(data_path, name, bool(value) if name in FLAGS else value)
+
+        written = []
+        if flags & WRITES:
+            writes = [(reader.varint(), reader.varint()) for _ in range(reader.varint())]
+            for addr, old in reversed(writes):
+                data_path.memory[addr] = f"{old:08X}"
+                written.append(addr)
+        if flags & INPUT:
+            consumed = len(self.input_tokens) - len(data_path.input_buffer)
+            data_path.input_buffer.appendleft(self.input_tokens[consumed - 1])
+        if flags & OUTPUT:
+            del data_path.output_buffer[-reader.varint() :]
+
+        self.position -= 1
+        self.halted = False
+        return written
+
+    def reload(self) -> None:
+        """Refills the log up to the current position from the checkpoint before its start."""
+        target = self.position
+        checkpoint = max(position for position in self.checkpoints if position < target)
+        self.checkpoints[checkpoint].restore(self)
+        self.position = self.log_start = checkpoint
+        self.log.clear()
+        self.offsets = array.array("Q")
+        self.step(target - checkpoint)
+
+    def back_until(self, stop: Callable[[list[int]], bool]) -> bool:
+        """Undoes instructions until `stop`, given the addresses written by the one just undone,
+        returns True. Returns False if it went back to the oldest checkpoint kept instead."""
+        while self.position > min(self.checkpoints):
+            if self.position == self.log_start:
+                self.reload()
+            if stop(self.undo()):
+                return True
+        return False
+
+    def step_back(self, count: int = 1) -> int:
+        """Undoes up to `count` instructions, returns the number undone."""
+        target = max(self.position - count, 0)
+        start = self.position
+        if target < start:
+            self.back_until(lambda _: self.position <= target)
+        return start - self.position
+
+    def back_to_write(self, addr: int) -> bool:
+        """Goes back to the last instruction that wrote `addr`, about to run it again."""
+        return self.back_until(lambda written: addr in written)
+
+    def reverse_continue(self, breakpoints: Collection[int]) -> bool:
+        """Goes back to the last time an instruction at a breakpoint was about to run."""
+        return self.back_until(lambda _: self.data_path.ip in breakpoints)
+
+    def output(self) -> str:
+        return "".join(self.data_path.output_buffer)
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import collections
+import random
+
+from src.machine.control_unit import ControlUnit
+from src.machine.hooks import Hooks
+from src.machine.metrics import REGIONS, image_layout, region
+
+POLICIES = ("lru", "fifo", "random")
+CACHES = ("instruction", "data")
+
+DEFAULT_MEMORY_LATENCY = 10
+
+
+class Cache:
+    """Set-associative write-back cache with write allocation; sizes are in memory words.
+
+    Only line addresses and dirty bits are kept, the data stays in DataPath memory.
+    """
+
+    def __init__(self, size: int = 256, associativity: int = 2, line_size: int = 4, policy: str = "lru"):
+        assert policy in POLICIES, f"Unknown replacement policy: {policy}, expected one of {POLICIES}"
+        assert size > 0, "Cache size must be positive"
+        assert size % (associativity * line_size) == 0, "Cache size must be a multiple of a set size"
+
+        self.size = size
+        self.associativity = associativity
+        self.line_size = line_size
+        self.policy = policy
+        self.set_count = size // (associativity * line_size)
+        self.sets: list[collections.OrderedDict[int, bool]] = [collections.OrderedDict() for _ in range(self.set_count)]
+        self.random = random.Random(0)
+
+    def access(self, addr: int, write: bool = False) -> tuple[bool, bool]:
+        """Returns whether `addr` hit and whether a dirty line was evicted to make room for it."""
+        line = addr // self.line_size
+        lines = self.sets[line % self.set_count]
+
+        if line in lines:
+            if self.policy == "lru":
+                lines.move_to_end(line)
+            lines[line] = lines[line] or write
+            return True, False
+
+        evicted_dirty = False
+        if len(lines) == self.associativity:
+            victim = self.random.choice(list(lines)) if self.policy == "random" else next(iter(lines))
+            evicted_dirty = lines.pop(victim)
+
+        lines[line] = write
+        return False, evicted_dirty
+
+    def to_json(self) -> dict:
+        return {
+            "size": self.size,
+            "associativity": self.associativity,
+            "line_size": self.line_size,
+            "policy": self.policy,
+        }
+
+
+class TimingModel:
+    """Memory hierarchy on top of the tick model of ControlUnit, which takes every access as a hit.
+
+    Instruction fetches go through `instruction_cache`, DataPath reads and writes through
+    `data_cache`. A miss stalls the machine for `memory_latency` ticks to fill the line, and one
+    more `memory_latency` if a dirty line is written back; without a cache every access of its
+    kind goes to memory and counts as a miss. Stalls are added to the tick counter as they
+    happen, hits and misses are counted per cache and memory region, see `Metrics`.
+    """
+
+    def __init__(
+        self,
+        image: list[str],
+        instruction_cache: Cache | None = None,
+        data_cache: Cache | None = None,
+        memory_latency: int = DEFAULT_MEMORY_LATENCY,
+    ):
+        self.code_start, self.stack_start = image_layout(image)
+        self.caches = {"instruction": instruction_cache, "data": data_cache}
+        self.memory_latency = memory_latency
+
+        self.hits = {name: dict.fromkeys(REGIONS, 0) for name in CACHES}
+        self.misses = {name: dict.fromkeys(REGIONS, 0) for name in CACHES}
+        self.stall_ticks = 0
+
+    @classmethod
+    def from_json(cls, image: list[str], config: dict) -> TimingModel:
+        """Model described by `to_json()["config"]`; a cache given as null is left out."""
+        caches = [config.get(name + "_cache", {}) for name in CACHES]
+        instruction_cache, data_cache = (None if cache is None else Cache(**cache) for cache in caches)
+        return cls(image, instruction_cache, data_cache, config.get("memory_latency", DEFAULT_MEMORY_LATENCY))
+
+    def access(self, name: str, addr: int, write: bool = False) -> int:
+        """Counts an access through the cache `name`, returns the ticks it stalls."""
+        cache = self.caches[name]
+        hit, evicted_dirty = (False, False) if cache is None else cache.access(addr, write)
+
+        counters = self.hits if hit else self.misses
+        counters[name][region(addr, self.code_start, self.stack_start)] += 1
+
+        stall = (0 if hit else self.memory_latency) + (self.memory_latency if evicted_dirty else 0)
+        self.stall_ticks += stall
+        return stall
+
+    def hooks(self, control_unit: ControlUnit) -> Hooks:
+        """Hooks adding the stalls of `control_unit` accesses to its tick counter."""
+
+        def on_fetch(ip, _):
+            control_unit._tick += self.access("instruction", ip)
+
+        def on_read(addr, _):
+            control_unit._tick += self.access("data", addr)
+
+        def on_write(addr, _):
+            control_unit._tick += self.access("data", addr, write=True)
+
+        hooks = Hooks()
+        hooks.on("fetch", on_fetch)
+        hooks.on("read", on_read)
+        hooks.on("write", on_write)
+        return hooks
+
+    def to_json(self) -> dict:
+        report: dict = {
+            "config": {
+                **{name + "_cache": None if cache is None else cache.to_json() for name, cache in self.caches.items()},
+                "memory_latency": self.memory_latency,
+            },
+            "stall_ticks": self.stall_ticks,
+        }
+
+        for name in CACHES:
+            report[name] = {}
+            for region_name in REGIONS:
+                hits, misses = self.hits[name][region_name], self.misses[name][region_name]
+                if hits + misses:
+                    report[name][region_name] = {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses)}
+
+        return report
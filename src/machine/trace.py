@@ -0,0 +1,302 @@
+from __future__ import annotations
+
+import abc
+import collections
+import gzip
+import sys
+
+from src.isa import POST_INDEXED, Opcode, command_from_hex, hex_to_mnemonic
+from src.machine.control_unit import ControlUnit
+
+MAGIC = b"LISPTRACE1\n"
+REGISTERS = ("ip", "ar", "sp", "alu", "acc")
+
+# record flags: a bit per register given as a delta, then memory writes and output
+IP_JUMP, AR, SP, ALU, ACC, WRITES, OUTPUT = (1 << bit for bit in range(7))
+REGISTER_FLAGS = {"ip": IP_JUMP, "ar": AR, "sp": SP, "alu": ALU, "acc": ACC}
+
+STREAM_BUFFER_SIZE = 64 * 1024
+
+
+def put_varint(buf: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buf.append(value & 0x7F | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def put_signed(buf: bytearray, value: int) -> None:
+    put_varint(buf, value << 1 if value >= 0 else (-value << 1) - 1)
+
+
+class Reader:
+    def __init__(self, data: bytes, pos: int = 0):
+        self.data = data
+        self.pos = pos
+
+    def varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self.data[self.pos]
+            self.pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def signed(self) -> int:
+        value = self.varint()
+        return value >> 1 if value & 1 == 0 else -((value + 1) >> 1)
+
+    def at_end(self) -> bool:
+        return self.pos >= len(self.data)
+
+
+class TraceState:
+    """Machine state as seen by a trace: registers, tick counter, memory and output so far."""
+
+    def __init__(self, memory: list[int], registers: dict[str, int], tick: int, output: list[str]):
+        self.memory = memory
+        self.registers = registers
+        self.tick = tick
+        self.output = output
+
+    @classmethod
+    def of(cls, control_unit: ControlUnit) -> TraceState:
+        data_path = control_unit.data_path
+        registers = {name: getattr(data_path, name) for name in REGISTERS}
+        memory = [int(word, 16) for word in data_path.memory]
+        return cls(memory, registers, control_unit._tick, list(data_path.output_buffer))
+
+    def encode(self) -> bytes:
+        buf = bytearray(MAGIC)
+        put_varint(buf, len(self.memory))
+        for word in self.memory:
+            put_varint(buf, word)
+        for name in REGISTERS:
+            put_signed(buf, self.registers[name])
+        put_varint(buf, self.tick)
+        put_varint(buf, len(self.output))
+        for char in self.output:
+            put_varint(buf, ord(char))
+        return bytes(buf)
+
+    @classmethod
+    def decode(cls, reader: Reader) -> TraceState:
+        assert reader.data.startswith(MAGIC), "Not a trace file"
+        reader.pos = len(MAGIC)
+
+        memory = [reader.varint() for _ in range(reader.varint())]
+        registers = {name: reader.signed() for name in REGISTERS}
+        tick = reader.varint()
+        output = [chr(reader.varint()) for _ in range(reader.varint())]
+        return cls(memory, registers, tick, output)
+
+    def apply(self, reader: Reader) -> list[str]:
+        """Applies the record at the reader position, returns the characters it printed."""
+        flags = reader.varint()
+        self.tick += reader.varint()
+
+        ip = self.registers["ip"]
+        self.registers["ip"] = ip + reader.signed() if flags & IP_JUMP else ip + 1
+        for name in ("ar", "sp", "alu", "acc"):
+            if flags & REGISTER_FLAGS[name]:
+                self.registers[name] += reader.signed()
+
+        if flags & WRITES:
+            for _ in range(reader.varint()):
+                addr = reader.varint()
+                self.memory[addr] = reader.varint()
+
+        printed = []
+        if flags & OUTPUT:
+            printed = [chr(reader.varint()) for _ in range(reader.varint())]
+            self.output.extend(printed)
+        return printed
+
+    def render(self) -> str:
+        """The line `ControlUnit.__repr__` logs in this state."""
+        registers = self.registers
+        state_repr = "TICK: {:4}, IP: {:4}, AR: {:4}, SP: {:4}, ALU: {:4}, ACC: {:4}".format(
+            self.tick, registers["ip"], registers["ar"], registers["sp"], registers["alu"], registers["acc"]
+        )
+        return "{} \t{}".format(state_repr, hex_to_mnemonic(f"{self.memory[registers['ip']]:08X}"))
+
+
+class TraceRecorder(abc.ABC):
+    """Encodes the state change of every instruction `simulation` runs on the interpreter engine.
+
+    A record holds a flags byte, the tick delta, deltas of changed registers (IP only when it
+    doesn't just move to the next instruction), the memory words written and the characters
+    printed, all as LEB128 varints; a typical record takes 3-6 bytes. Written addresses follow
+    from the instruction itself, as in TracingJit, so DataPath isn't instrumented.
+    """
+
+    def __init__(self):
+        self.control_unit: ControlUnit | None = None
+        self.previous: tuple[int, ...] = ()
+        self.tick = 0
+        self.output_len = 0
+        self.writes: dict[str, tuple[int | None, str | None]] = {}
+
+    def start(self, control_unit: ControlUnit) -> None:
+        self.control_unit = control_unit
+        state = TraceState.of(control_unit)
+        self.previous = tuple(state.registers[name] for name in REGISTERS)
+        self.tick, self.output_len = state.tick, len(state.output)
+        self.emit_header(state)
+
+    @staticmethod
+    def written_by(word: str) -> tuple[int | None, str | None]:
+        """The fixed address an instruction writes to and the register holding the other one."""
+        opcode, addr_type, arg = command_from_hex(word)
+        fixed = arg if addr_type in POST_INDEXED else None
+        if opcode in (Opcode.SAVE, Opcode.INC, Opcode.DEC):
+            return fixed, "ar"
+        if opcode in (Opcode.PUSH, Opcode.CALL):
+            return fixed, "sp"
+        return fixed, None
+
+    def record(self, word: str) -> None:
+        """Records the instruction `word` that has just run."""
+        control_unit = self.control_unit
+        assert control_unit is not None
+        data_path = control_unit.data_path
+        written = self.writes.get(word)
+        if written is None:
+            written = self.writes[word] = self.written_by(word)
+
+        values = (data_path.ip, data_path.ar, data_path.sp, data_path.alu, data_path.acc)
+        previous = self.previous
+        flags = 0
+        deltas = []
+        for index, value in enumerate(values):
+            delta = value - previous[index]
+            if delta != (index == 0):
+                flags |= 1 << index
+                deltas.append(delta)
+        self.previous = values
+
+        fixed, register = written
+        writes = [] if fixed is None else [fixed]
+        if register is not None:
+            writes.append(getattr(data_path, register))
+        if writes:
+            flags |= WRITES
+
+        output_buffer = data_path.output_buffer
+        printed = output_buffer[self.output_len :] if len(output_buffer) != self.output_len else None
+        if printed:
+            flags |= OUTPUT
+            self.output_len = len(output_buffer)
+
+        buf = bytearray((flags,))
+        put_varint(buf, control_unit._tick - self.tick)
+        self.tick = control_unit._tick
+        for delta in deltas:
+            put_signed(buf, delta)
+
+        if writes:
+            put_varint(buf, len(writes))
+            for addr in writes:
+                put_varint(buf, addr)
+                put_varint(buf, int(data_path.memory[addr], 16))
+
+        if printed:
+            put_varint(buf, len(printed))
+            for char in printed:
+                put_varint(buf, ord(char))
+
+        self.emit_record(bytes(buf))
+
+    @abc.abstractmethod
+    def emit_header(self, state: TraceState) -> None:
+        """Takes the state the trace starts from."""
+
+    @abc.abstractmethod
+    def emit_record(self, record: bytes) -> None:
+        """Takes the encoded record of an instruction."""
+
+
+class StreamTrace(TraceRecorder):
+    """Writes the whole trace into a gzip-compressed file as it runs."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.file = gzip.open(path, "wb", compresslevel=6)
+        self.buffer = bytearray()
+
+    def emit_header(self, state: TraceState) -> None:
+        self.file.write(state.encode())
+
+    def emit_record(self, record: bytes) -> None:
+        self.buffer += record
+        if len(self.buffer) >= STREAM_BUFFER_SIZE:
+            self.file.write(self.buffer)
+            self.buffer.clear()
+
+    def close(self) -> None:
+        self.file.write(self.buffer)
+        self.file.close()
+
+
+class RingTrace(TraceRecorder):
+    """Keeps the last `size` records in memory; dropped records are applied to the base state
+    they are replayed from, so `dump` writes a trace file starting `size` instructions back."""
+
+    def __init__(self, size: int):
+        super().__init__()
+        self.size = size
+        self.records: collections.deque[bytes] = collections.deque()
+        self.base: TraceState | None = None
+
+    def emit_header(self, state: TraceState) -> None:
+        self.base = state
+        self.records.clear()
+
+    def emit_record(self, record: bytes) -> None:
+        assert self.base is not None
+        self.records.append(record)
+        if len(self.records) > self.size:
+            self.base.apply(Reader(self.records.popleft()))
+
+    def dump(self, path: str) -> None:
+        assert self.base is not None
+        with gzip.open(path, "wb") as f:
+            f.write(self.base.encode())
+            for record in self.records:
+                f.write(record)
+
+
+def replay(path: str, start: int = 0, stop: int | None = None):
+    """Yields the interpreter's debug log lines of a trace file: the state after `start` instructions
+    of the trace, then output and state lines of the following ones up to instruction `stop`."""
+    with gzip.open(path, "rb") as f:
+        reader = Reader(f.read())
+
+    state = TraceState.decode(reader)
+    if start == 0:
+        yield state.render()
+
+    index = 0
+    while not reader.at_end() and (stop is None or index < stop):
+        output_before = "".join(state.output)
+        printed = state.apply(reader)
+        index += 1
+
+        if index > start:
+            for char in printed:
+                yield "output: {} << {}".format(repr(output_before), repr(char))
+                output_before += char
+        if index >= start:
+            yield state.render()
+
+
+def main(trace_file, start=0, stop=None):
+    for line in replay(trace_file, int(start), None if stop is None else int(stop)):
+        print(line)
+
+
+if __name__ == "__main__":
+    assert len(sys.argv) in (2, 3, 4), "Wrong arguments: trace.py <trace_file> [start [stop]]"
+    main(*sys.argv[1:])
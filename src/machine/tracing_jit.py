@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+from src.isa import POST_INDEXED, WORD_MASK, AddressingType, Opcode, command_from_hex, hex_to_mnemonic
+from src.machine.control_unit import ControlUnit, instruction_ticks
+
+HOT_LOOP_THRESHOLD = 8
+MAX_TRACE_LENGTH = 256
+
+TRACEABLE = {
+    Opcode.ADD,
+    Opcode.SUB,
+    Opcode.DIV,
+    Opcode.MOD,
+    Opcode.CMP,
+    Opcode.INC,
+    Opcode.DEC,
+    Opcode.LOAD,
+    Opcode.SAVE,
+    Opcode.INPUT,
+    Opcode.PRINT,
+    Opcode.PRINTS,
+    Opcode.PUSH,
+    Opcode.POP,
+    Opcode.JMP,
+    Opcode.JZ,
+    Opcode.JNZ,
+}
+MEMORY_WRITERS = {Opcode.SAVE, Opcode.INC, Opcode.DEC, Opcode.PUSH, Opcode.CALL}
+ALU_SYMBOLS = {Opcode.ADD: "+", Opcode.SUB: "-", Opcode.CMP: "-", Opcode.DIV: "//", Opcode.MOD: "%"}
+
+
+class TraceAbortedError(Exception):
+    pass
+
+
+class TraceCompiler:
+    """Generates a Python function running a recorded trace on a DataPath.
+
+    A trace coming back to its first instruction is a loop and is repeated while a whole
+    iteration fits into the instruction budget, any other trace runs once. Every conditional jump
+    is guarded to take the recorded direction, INPUT is guarded to have input available, and a
+    write into traced code leaves it. On leaving, registers are stored back into the DataPath
+    with IP at the first instruction not executed, and the numbers of executed instructions and
+    ticks are returned along with the addresses written by the last instruction if it left
+    because of them.
+    """
+
+    def __init__(self, trace: list[tuple[int, str, int]], trace_code: dict[int, set[int]]):
+        self.trace = trace
+        self.trace_code = trace_code
+        self.code = {ip for ip, _, _ in trace}
+        self.lines: list[str] = []
+        self.writes: list[str] = []
+        self.executed = 0
+        self.ticks = 0
+        self.cost = 0
+
+    def emit(self, line: str) -> None:
+        self.lines.append("        " + line)
+
+    def emit_exit(self, ip: int, after_current: bool, written: str = "()") -> None:
+        executed = self.executed + 1 if after_current else self.executed
+        ticks = self.ticks + self.cost if after_current else self.ticks
+
+        self.emit(f"    dp.acc, dp.alu, dp.ar, dp.sp, dp.ip = acc, alu, ar, sp, {ip}")
+        self.emit(f"    return instr + {executed}, ticks + {ticks}, {written}")
+
+    def emit_address_selection(self, addr_type: AddressingType | None, arg: int) -> None:
+        if addr_type is AddressingType.DIRECT:
+            self.emit(f"ar = {arg}")
+        elif addr_type is AddressingType.INDIRECT:
+            self.emit(f"ar = alu = int(memory[{arg}], 16)")
+        elif addr_type is AddressingType.SP_INDIRECT:
+            self.emit(f"ar = alu = (sp + {arg}) & MASK")
+        elif addr_type in POST_INDEXED:
+            if arg in self.code:
+                raise TraceAbortedError()
+            self.emit(f"ar = alu = int(memory[{arg}], 16)")
+            self.emit_write(str(arg), f"(ar + {POST_INDEXED[addr_type]}) & MASK")
+
+    def operand(self, addr_type: AddressingType | None, arg: int) -> str:
+        if addr_type is AddressingType.OPERAND_LOAD:
+            return str(arg)
+        self.emit_address_selection(addr_type, arg)
+        return "int(memory[ar], 16)"
+
+    def emit_write(self, addr: str, value: str = "acc") -> None:
+        self.emit(f'memory[{addr}] = f"{{{value}:08X}}"')
+        self.writes.append(addr)
+
+    def emit_write_guard(self, next_ip: int) -> None:
+        self.emit("if " + " or ".join(f"{addr} in TRACE_CODE" for addr in self.writes) + ":")
+        self.emit_exit(next_ip, after_current=True, written="({},)".format(", ".join(self.writes)))
+        self.writes.clear()
+
+    def emit_instruction(self, ip: int, opcode: Opcode, addr_type: AddressingType | None, arg: int, next_ip: int):
+        if opcode in ALU_SYMBOLS:
+            value = self.operand(addr_type, arg)
+            target = "alu" if opcode is Opcode.CMP else "acc = alu"
+            self.emit(f"{target} = (acc {ALU_SYMBOLS[opcode]} {value}) & MASK")
+
+        elif opcode is Opcode.LOAD:
+            self.emit(f"acc = alu = {self.operand(addr_type, arg)}")
+
+        elif opcode in {Opcode.SAVE, Opcode.INC, Opcode.DEC}:
+            if addr_type is AddressingType.DIRECT and arg in self.code:
+                raise TraceAbortedError()
+            self.emit_address_selection(addr_type, arg)
+            if opcode is not Opcode.SAVE:
+                self.emit(f"acc = alu = (int(memory[ar], 16) {'+' if opcode is Opcode.INC else '-'} 1) & MASK")
+            self.emit_write("ar")
+
+        elif opcode is Opcode.PUSH:
+            self.emit("sp -= 1")
+            self.emit_write("sp")
+
+        elif opcode is Opcode.POP:
+            self.emit("sp += 1")
+
+        elif opcode is Opcode.PRINT:
+            self.emit("output.append(chr(acc))")
+
+        elif opcode is Opcode.PRINTS:
+            self.emit("ar = acc")
+            self.emit("while int(memory[ar], 16):")
+            self.emit("    output.append(chr(int(memory[ar], 16)))")
+            self.emit("    ar += 1")
+            self.emit("ticks += ar - acc + 1")
+            self.emit("acc = alu = 0")
+
+        elif opcode is Opcode.INPUT:
+            self.emit("if not input_buffer:")
+            self.emit_exit(ip, after_current=False)
+            self.emit("acc = ord(input_buffer.pop(0))")
+
+        elif opcode is Opcode.JZ or opcode is Opcode.JNZ:
+            taken = next_ip == arg
+            exits_on_zero = taken == (opcode is Opcode.JNZ)
+            self.emit(f"if alu {'==' if exits_on_zero else '!='} 0:")
+            self.emit_exit(ip + 1 if taken else arg, after_current=True)
+
+    def compile(self):
+        for ip, word, next_ip in self.trace:
+            opcode, addr_type, arg = command_from_hex(word)
+            if opcode not in TRACEABLE:
+                raise TraceAbortedError()
+
+            self.cost = instruction_ticks(opcode, addr_type)
+            self.emit(f"# {ip}: {hex_to_mnemonic(word)}")
+            self.emit_instruction(ip, opcode, addr_type, arg, next_ip)
+            if self.writes:
+                self.emit_write_guard(ip + 1)
+            self.executed += 1
+            self.ticks += self.cost
+
+        head, end = self.trace[0][0], self.trace[-1][2]
+        if end != head:
+            self.lines.append(f"        dp.acc, dp.alu, dp.ar, dp.sp, dp.ip = acc, alu, ar, sp, {end}")
+            self.lines.append(f"        return instr + {self.executed}, ticks + {self.ticks}, ()")
+
+        source = "\n".join(
+            [
+                "def trace(dp, budget):",
+                "    acc, alu, ar, sp = dp.acc, dp.alu, dp.ar, dp.sp",
+                "    memory, output, input_buffer = dp.memory, dp.output_buffer, dp.input_buffer",
+                "    instr = ticks = 0",
+                f"    while instr + {self.executed} <= budget:",
+                *self.lines,
+                f"        instr += {self.executed}",
+                f"        ticks += {self.ticks}",
+                f"    dp.acc, dp.alu, dp.ar, dp.sp, dp.ip = acc, alu, ar, sp, {head}",
+                "    return instr, ticks, ()",
+            ]
+        )
+
+        namespace = {"MASK": WORD_MASK, "TRACE_CODE": self.trace_code}
+        exec(compile(source, f"<trace {head}>", "exec"), namespace)
+        return namespace["trace"]
+
+
+class TracingJit:
+    """Interprets with ControlUnit and compiles hot loops into Python functions.
+
+    Targets of backward jumps are counted as loop heads, and so are addresses where
+    compiled traces leave through a guard. When such an address gets hot, the instructions
+    interpreted from it until control comes back to it or reaches another trace are recorded
+    and compiled with TraceCompiler; later arrivals at the address run the compiled trace
+    instead. Paths with CALL, RETURN or HLT, or longer than MAX_TRACE_LENGTH, stay interpreted.
+    Ticks and instruction counts match ControlUnit, carry and overflow flags are not tracked in
+    traces.
+    """
+
+    def __init__(self, control_unit: ControlUnit, hot_loop_threshold: int = HOT_LOOP_THRESHOLD):
+        self.control_unit = control_unit
+        self.data_path = control_unit.data_path
+        self.hot_loop_threshold = hot_loop_threshold
+        self.instr_counter = 0
+
+        self.hot_counters: dict[int, int] = {}
+        self.traces: dict = {}
+        self.trace_code: dict[int, set[int]] = {}
+        self.recording: list[tuple[int, str, int]] | None = None
+
+    @property
+    def tick_counter(self) -> int:
+        return self.control_unit._tick
+
+    def invalidate(self, addr: int) -> None:
+        for head in self.trace_code.pop(addr, set()):
+            self.traces.pop(head, None)
+            self.hot_counters[head] = 0
+
+    def finish_recording(self) -> None:
+        assert self.recording is not None
+        trace, self.recording = self.recording, None
+        head = trace[0][0]
+
+        try:
+            self.traces[head] = TraceCompiler(trace, self.trace_code).compile()
+        except TraceAbortedError:
+            self.hot_counters[head] = -1
+            return
+
+        for ip, _, _ in trace:
+            self.trace_code.setdefault(ip, set()).add(head)
+
+    def record(self, ip: int, word: str) -> None:
+        assert self.recording is not None
+        next_ip = self.data_path.ip
+        self.recording.append((ip, word, next_ip))
+
+        if next_ip == self.recording[0][0] or next_ip in self.traces:
+            self.finish_recording()
+        elif len(self.recording) >= MAX_TRACE_LENGTH or command_from_hex(word)[0] not in TRACEABLE:
+            self.hot_counters[self.recording[0][0]] = -1
+            self.recording = None
+
+    def count(self, ip: int) -> None:
+        if self.hot_counters.get(ip) == -1:
+            return
+
+        self.hot_counters[ip] = self.hot_counters.get(ip, 0) + 1
+        if self.hot_counters[ip] >= self.hot_loop_threshold and ip not in self.traces:
+            self.recording = []
+
+    def interpret(self) -> None:
+        data_path = self.data_path
+        ip = data_path.ip
+        word = data_path.memory[ip]
+        opcode, addr_type, arg = command_from_hex(word)
+
+        self.control_unit.decode_and_execute_instruction()
+
+        if self.trace_code and opcode in MEMORY_WRITERS:
+            self.invalidate(data_path.sp if opcode in {Opcode.PUSH, Opcode.CALL} else data_path.ar)
+        if self.trace_code and addr_type in POST_INDEXED:
+            self.invalidate(arg)
+
+        if self.recording is not None:
+            self.record(ip, word)
+        elif opcode in {Opcode.JMP, Opcode.JZ, Opcode.JNZ} and data_path.ip <= ip:
+            self.count(data_path.ip)
+
+    def run(self, limit: int) -> None:
+        control_unit = self.control_unit
+
+        while self.instr_counter < limit:
+            ip = self.data_path.ip
+            trace = self.traces.get(ip) if self.recording is None else None
+
+            if trace is not None:
+                executed, ticks, written = trace(self.data_path, limit - self.instr_counter)
+                self.instr_counter += executed
+                control_unit._tick += ticks
+                for addr in written:
+                    self.invalidate(addr)
+                if not written and self.data_path.ip not in self.traces:
+                    self.count(self.data_path.ip)
+                if executed:
+                    continue
+
+            self.interpret()
+            self.instr_counter += 1
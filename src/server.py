@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import functools
+import json
+import logging
+import socket
+import socketserver
+import sys
+from pathlib import Path
+
+from src.machine.machine import ENGINES, simulation
+from src.translator.main import translate
+
+COMPILED_SOURCES_CACHE_SIZE = 256
+
+
+@functools.lru_cache(maxsize=COMPILED_SOURCES_CACHE_SIZE)
+def compile_source(source: str) -> tuple[str, ...]:
+    memory, _ = translate(source)
+    return tuple(memory)
+
+
+def run_job(job: dict) -> dict:
+    """Runs one job: `source` (translated, the last images are kept) or an already translated `image`,
+    with `input` text, `limit` and `engine`, the same defaults as `machine.py`."""
+    image = compile_source(job["source"]) if "source" in job else job["image"]
+    input_tokens = [*job.get("input", ""), "\0"]
+    engine = job.get("engine", "interpreter")
+    assert engine in ENGINES, f"Unknown engine: {engine}, expected one of {ENGINES}"
+
+    output, instr_counter, ticks, termination = simulation(
+        list(image), input_tokens, job.get("limit", 1000), engine, with_termination=True
+    )
+    return {"output": output, "instr_counter": instr_counter, "ticks": ticks, "termination": termination}
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """Reads jobs as JSON lines and answers each with a JSON line of its result or `error`."""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                response = run_job(json.loads(line))
+            except Exception as e:
+                logging.exception("Job failed")
+                response = {"error": f"{type(e).__name__}: {e}"}
+
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class SimulationServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(socket_path: str) -> None:
+    Path(socket_path).unlink(missing_ok=True)
+
+    try:
+        with SimulationServer(socket_path, JobHandler) as server:
+            logging.info("Serving on %s", socket_path)
+            server.serve_forever()
+    finally:
+        Path(socket_path).unlink(missing_ok=True)
+
+
+class Client:
+    """Connection to a running server, jobs are sent one at a time over it."""
+
+    def __init__(self, socket_path: str):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.connect(socket_path)
+        self.file = self.socket.makefile("rwb")
+
+    def run(self, **job) -> dict:
+        self.file.write(json.dumps(job).encode() + b"\n")
+        self.file.flush()
+        return json.loads(self.file.readline())
+
+    def close(self) -> None:
+        self.file.close()
+        self.socket.close()
+
+
+def main(socket_path, source_file, input_file, engine="interpreter"):
+    with open(source_file, encoding="utf-8") as f:
+        source = f.read()
+    with open(input_file, encoding="utf-8") as f:
+        input_text = f.read()
+
+    client = Client(socket_path)
+    try:
+        result = client.run(source=source, input=input_text, engine=engine)
+    finally:
+        client.close()
+
+    assert "error" not in result, result.get("error")
+    print(result["output"])
+    print(f"instr_counter: {result['instr_counter']}, ticks: {result['ticks']}")
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.INFO)
+    assert len(sys.argv) in (2, 4, 5), (
+        "Wrong arguments: server.py <socket> to serve, server.py <socket> <source_file> <input_file> [engine] to run"
+    )
+    if len(sys.argv) == 2:
+        serve(sys.argv[1])
+    else:
+        main(*sys.argv[1:])
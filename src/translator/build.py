@@ -0,0 +1,46 @@
+import hashlib
+import pickle
+import sys
+from pathlib import Path
+
+from src.translator.lexer import Lexer
+from src.translator.linker import ObjectModule, link
+from src.translator.translator import Translator
+
+OBJECT_SUFFIX = ".o"
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def compile_module(source_file: str, object_file: str) -> ObjectModule:
+    """Translates a source file into an object file, unless the object file was made from the same source."""
+    with open(source_file, encoding="utf-8") as f:
+        source = f.read()
+
+    digest = source_hash(source)
+    if Path(object_file).exists():
+        module = ObjectModule.load(object_file)
+        if module.source_hash == digest:
+            return module
+
+    module = Translator().compile(Lexer().text_to_terms(source))
+    module.source_hash = digest
+    module.save(object_file)
+    return module
+
+
+def main(bin_dst_file, *src_files):
+    modules = [compile_module(src_file, src_file + OBJECT_SUFFIX) for src_file in src_files]
+    memory, _ = link(modules)
+
+    with open(bin_dst_file, "wb") as f:
+        pickle.dump(memory, f)
+
+    print("modules:", len(modules), "machine code instr:", len(memory))
+
+
+if __name__ == "__main__":
+    assert len(sys.argv) >= 3, "Wrong arguments: build.py <binary_file> <source_file>..."
+    main(*sys.argv[1:])
@@ -15,3 +15,12 @@ class TermError(Exception):
 
     def __str__(self):
         return self.error_string + f" - {self.term}"
+
+
+class LinkError(Exception):
+    def __init__(self, symbol, error_string):
+        self.symbol = symbol
+        self.error_string = error_string
+
+    def __str__(self):
+        return self.error_string + f" - {self.symbol}"
@@ -56,7 +56,7 @@ class Lexer:
         self.brackets_num -= 1
 
     def process_char(self, line_num, pos, char):
-        if re.match(r"'.*\n*", "".join(self.atom)):
+        if self.atom and self.atom[0] == "'":
             self.process_string_char(char)
 
         elif char == "(":
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import json
+
+from src.isa import AddressingType, Opcode, command_to_hex
+from src.translator.errors import LinkError
+
+# kinds of an operand or data word holding an address, and the sections they are in
+CODE, DATA = "code", "data"
+
+# kinds of the symbols a module defines
+FUNCTION, VARIABLE, ARRAY = "function", "variable", "array"
+
+
+class ObjectModule:
+    """A separately translated module.
+
+    `code` holds instructions numbered from 0, `data` holds data words numbered from 1 (word 0 of an
+    image is the jump to the code). `symbols` maps the functions, global variables and strings the
+    module defines to their kind and address in its own numbering. A relocation
+    `(section, index, kind, symbol)` marks a code operand or data word holding a `kind` address:
+    without a symbol it's the module's own address to be moved by its section base, with a symbol
+    it's a placeholder for the address of a symbol defined by another module (`extern`).
+    """
+
+    def __init__(
+        self,
+        code: list[str],
+        data: list[str],
+        symbols: dict[str, tuple[str, int]],
+        relocations: list[tuple[str, int, str, str | None]],
+        source_hash: str | None = None,
+    ):
+        self.code = code
+        self.data = data
+        self.symbols = symbols
+        self.relocations = relocations
+        self.source_hash = source_hash
+
+    def to_json(self) -> dict:
+        return {
+            "code": self.code,
+            "data": self.data,
+            "symbols": self.symbols,
+            "relocations": self.relocations,
+            "source_hash": self.source_hash,
+        }
+
+    @classmethod
+    def from_json(cls, obj: dict) -> ObjectModule:
+        symbols = {name: (kind, addr) for name, (kind, addr) in obj["symbols"].items()}
+        relocations = [(section, index, kind, symbol) for section, index, kind, symbol in obj["relocations"]]
+        return cls(obj["code"], obj["data"], symbols, relocations, obj["source_hash"])
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f)
+
+    @classmethod
+    def load(cls, path: str) -> ObjectModule:
+        with open(path, encoding="utf-8") as f:
+            return cls.from_json(json.load(f))
+
+
+def resolve(modules: list[ObjectModule], bases: list[tuple[int, int]]) -> dict[str, list[tuple[str, int]]]:
+    """Image addresses of the symbols every module defines, by name."""
+    definitions: dict[str, list[tuple[str, int]]] = {}
+
+    for module, (code_base, data_base) in zip(modules, bases):
+        for name, (kind, addr) in module.symbols.items():
+            image_addr = code_base + addr if kind == FUNCTION else data_base + addr - 1
+            definitions.setdefault(name, []).append((kind, image_addr))
+
+    return definitions
+
+
+def symbol_address(definitions: dict[str, list[tuple[str, int]]], symbol: str, kind: str) -> int:
+    found = definitions.get(symbol)
+
+    if not found:
+        raise LinkError(symbol, "Undefined symbol")
+    if len(found) > 1:
+        raise LinkError(symbol, "Symbol is defined in several modules")
+
+    symbol_kind, addr = found[0]
+    if (symbol_kind == FUNCTION) != (kind == CODE):
+        raise LinkError(symbol, f"Symbol is a {symbol_kind}")
+
+    return addr
+
+
+def link(modules: list[ObjectModule]) -> tuple[list[str], list[int]]:
+    """Lays out the data of all modules after word 0, then their code in the given order, so the
+    top-level expressions of the modules run one after another, and ends the image with `halt`.
+    Returns the image and the addresses of its jump instructions, as Translator.relocations."""
+    data_size = 1 + sum(len(module.data) for module in modules)
+
+    bases = []
+    data_base, code_base = 1, data_size
+    for module in modules:
+        bases.append((code_base, data_base))
+        data_base += len(module.data)
+        code_base += len(module.code)
+
+    definitions = resolve(modules, bases)
+    image = [command_to_hex(Opcode.JMP, AddressingType.DIRECT, data_size)]
+    for module in modules:
+        image.extend(module.data)
+    for module in modules:
+        image.extend(module.code)
+
+    jumps = [0]
+    for module, (code_base, data_base) in zip(modules, bases):
+        for section, index, kind, symbol in module.relocations:
+            word_addr = code_base + index if section == CODE else data_base + index - 1
+            word = image[word_addr]
+            addr = int(word, 16) if section == DATA else int(word[2:], 16)
+
+            if symbol is not None:
+                addr = symbol_address(definitions, symbol, kind)
+            elif kind == CODE:
+                addr += code_base
+            else:
+                addr += data_base - 1
+
+            if section == DATA:
+                image[word_addr] = format(addr, "08X")
+            else:
+                image[word_addr] = word[:2] + format(addr, "06X")
+
+            if kind == CODE:
+                jumps.append(word_addr)
+
+    image.append(command_to_hex(Opcode.HLT))
+    return image, sorted(jumps)
@@ -1,41 +1,33 @@
 import pickle
 import sys
 
-from src.isa import hex_to_mnemonic
+from src.disassembler import listing, write_lines
 from src.translator.lexer import Lexer
 from src.translator.translator import Translator
 
 
 def translate(text):
+    """Returns the image and its debug listing. The listing is an iterator over its lines, made as
+    it's consumed (see `disassembler.listing`), so callers that don't need it pay nothing."""
     lexer = Lexer()
     translator = Translator()
 
     memory = translator.translate(lexer.text_to_terms(text))
 
-    debug = [f"{0} - {memory[0]} - {hex_to_mnemonic(memory[0])}", "\nDATA MEMORY"]
-
-    for i in range(1, len(translator.data_memory)):
-        if int(memory[i], 16) > 32:
-            debug.append(f"{i} - {memory[i]} - {int(memory[i], 16)} - {chr(int(memory[i], 16))}")
-        else:
-            debug.append(f"{i} - {memory[i]} - {int(memory[i], 16)}")
-
-    debug.append("\nCODE MEMORY")
-
-    for i in range(len(translator.data_memory), len(memory)):
-        debug.append(f"{i} - {memory[i]} - {hex_to_mnemonic(memory[i])}")
-
-    return memory, debug
+    return memory, listing(memory)
 
 
 def main(src_file, debug_dst_file, bin_dst_file):
+    """Translates `src_file` into `bin_dst_file`, the debug listing is streamed to `debug_dst_file`
+    unless it's None."""
     with open(src_file, encoding="utf-8") as f:
         source_code = f.read()
 
     memory, debugging_output = translate(source_code)
 
-    with open(debug_dst_file, "w", encoding="utf-8") as f:
-        f.write("\n".join(debugging_output))
+    if debug_dst_file is not None:
+        with open(debug_dst_file, "w", encoding="utf-8") as f:
+            write_lines(debugging_output, f)
 
     with open(bin_dst_file, "wb") as f:
         pickle.dump(memory, f)
@@ -44,7 +36,10 @@ def main(src_file, debug_dst_file, bin_dst_file):
 
 
 if __name__ == "__main__":
-    assert len(sys.argv) == 2, "Wrong arguments: main.py <input_file>"
-    _, src = sys.argv
+    flags = {arg for arg in sys.argv[1:] if arg.startswith("--")}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    usage = "Wrong arguments: main.py [--no-debug] <input_file>"
+    assert len(args) == 1, usage
+    assert flags <= {"--no-debug"}, usage
     debug_dst, bin_dst = "../translator-output/debug", "../translator-output/binary"
-    main(src, debug_dst, bin_dst)
+    main(args[0], None if "--no-debug" in flags else debug_dst, bin_dst)
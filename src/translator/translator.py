@@ -1,10 +1,32 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Generator
+from typing import Any
 
-from src.isa import AddressingType, Opcode, command_from_hex, command_to_hex
+from src.isa import NO_OPERAND_OPCODES, AddressingType, Opcode, command_from_hex, command_to_hex
 from src.translator.errors import TermError
 from src.translator.lexer import arithmetic_symbols, boolean_literal, comparison_symbols
+from src.translator.linker import ARRAY, CODE, DATA, FUNCTION, VARIABLE, ObjectModule, link
+
+# name of a stack slot holding a temporary value, can't clash with a variable as it isn't a token
+TEMPORARY_SLOT = " "
+
+# operands standing for `extern` symbols count down from here, so they never equal a real address
+EXTERN_OPERAND = 0xFFFFFF
+
+# direct, indirect and post-indexed operands are code addresses for jumps and data addresses for
+# the other instructions that have an operand
+JUMP_OPCODES = {Opcode.JMP, Opcode.JZ, Opcode.JNZ, Opcode.CALL}
+ADDRESS_ADDRESSING = {
+    AddressingType.DIRECT,
+    AddressingType.INDIRECT,
+    AddressingType.POST_INCREMENT,
+    AddressingType.POST_DECREMENT,
+}
+
+# a translation step, yields the steps it depends on and gets their results back, see `Translator.run`
+Task = Generator[Any, Any, Any]
 
 
 def arithmetic_symbol_to_opcode(symbol):
@@ -16,6 +38,19 @@ def arithmetic_symbol_to_opcode(symbol):
     }.get(symbol)
 
 
+def term_atoms(term) -> set[str]:
+    atoms, stack = set(), [term]
+
+    while stack:
+        term = stack.pop()
+        if isinstance(term, list):
+            stack.extend(term)
+        else:
+            atoms.add(str(term))
+
+    return atoms
+
+
 class Translator:
     def __init__(self):
         self.pc = 0
@@ -29,6 +64,12 @@ class Translator:
 
         self.functions = {}
         self.fun_variables = {}
+        self.externs = {}
+        self.extern_names = {}
+
+        self.code_relocations = {}
+        self.data_relocations = []
+        self.relocations = []
 
     def add_command(
         self,
@@ -43,30 +84,47 @@ class Translator:
 
         elif index is None:
             self.code_memory.append(command_to_hex(opcode, addressing_type, operand))
+            self.add_relocation(self.pc, opcode, addressing_type, operand)
             self.pc += 1
         else:
             self.code_memory[index] = command_to_hex(opcode, addressing_type, operand)
+            self.add_relocation(index, opcode, addressing_type, operand)
+
+    def add_relocation(self, index: int, opcode: Opcode, addressing_type: AddressingType | None, operand) -> None:
+        if opcode in NO_OPERAND_OPCODES or (addressing_type or AddressingType.DIRECT) not in ADDRESS_ADDRESSING:
+            return
+
+        kind = CODE if opcode in JUMP_OPCODES else DATA
+        self.code_relocations[index] = (kind, self.extern_names.get(operand))
+
+    def add_address_load(self, addr: int) -> None:
+        """Loads a data address into AC, unlike a number it's moved when the module is linked."""
+        self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, addr)
+        self.code_relocations[self.pc - 1] = (DATA, self.extern_names.get(addr))
 
     def add_data(self, data: int, count: int = 1) -> int:
         new_data_addr = len(self.data_memory)
         self.data_memory.extend([format(data, "X").zfill(8)] * count)
         return new_data_addr
 
-    def operation_with_var(self, term, opcode: Opcode, var_name: str, fun_name: str) -> None:
-        var_addr = self.variables.get(var_name)
+    def get_var_operand(self, term, var_name: str, fun_name: str) -> tuple[AddressingType, int]:
+        var_addr = self.variables.get(var_name, self.externs.get(var_name))
 
         if var_addr is not None:
-            self.add_command(opcode, AddressingType.DIRECT, var_addr)
+            return AddressingType.DIRECT, var_addr
 
-        elif fun_name is not None:
+        if fun_name is not None:
             try:
-                var_addr = self.fun_variables.get(fun_name).index(var_name)
-                self.add_command(opcode, AddressingType.SP_INDIRECT, var_addr)
+                return AddressingType.SP_INDIRECT, self.fun_variables.get(fun_name).index(var_name)
 
             except ValueError:
                 raise TermError(term, "No such variable") from ValueError
-        else:
-            raise TermError(term, "No such variable")
+
+        raise TermError(term, "No such variable")
+
+    def operation_with_var(self, term, opcode: Opcode, var_name: str, fun_name: str) -> None:
+        addressing_type, var_addr = self.get_var_operand(term, var_name, fun_name)
+        self.add_command(opcode, addressing_type, var_addr)
 
     def operation_with_num_literal(self, term, opcode: Opcode, num_literal: int) -> None:
         if num_literal <= pow(2, 24) - 1:
@@ -114,9 +172,11 @@ class Translator:
         args_names.append("")
         self.fun_variables[name] = list(reversed(args_names))
 
-        for expr in expressions:
-            if isinstance(expr, list):
-                self.translate_term(expr, name)
+        for i, expr in enumerate(expressions):
+            if isinstance(expr, list) and i == len(expressions) - 1:
+                yield self.translate_tail_term(expr, name)
+            elif isinstance(expr, list):
+                yield self.translate_term(expr, name)
             else:
                 self.operation_with_var(term, Opcode.LOAD, expr, name)
 
@@ -129,37 +189,96 @@ class Translator:
         self.add_command(Opcode.RETURN)
         self.add_command(Opcode.JMP, AddressingType.DIRECT, self.pc, jmp_command_pc)
 
+    def translate_argument(self, term, arg, fun_name):
+        if isinstance(arg, list):
+            yield self.translate_term(arg, fun_name)
+
+        elif re.match(r"\d+", arg):
+            self.operation_with_num_literal(term, Opcode.LOAD, int(arg))
+        else:
+            self.operation_with_var(term, Opcode.LOAD, arg, fun_name)
+
     def translate_fun_call(self, term, fun_name):
         name = term[0]
         args = term[1:]
 
         for arg in args:
-            if re.match(r"\d+", str(arg)):
-                self.operation_with_num_literal(term, Opcode.LOAD, int(arg))
-
-            elif isinstance(arg, list):
-                self.translate_term(arg, fun_name)
-            else:
-                self.operation_with_var(term, Opcode.LOAD, arg, fun_name)
-
+            yield self.translate_argument(term, arg, fun_name)
             self.add_command(Opcode.PUSH)
 
-        fun_addr = self.functions.get(name)
+        fun_addr = self.functions.get(name, self.externs.get(name))
         self.add_command(Opcode.CALL, AddressingType.DIRECT, fun_addr)
 
         for _ in args:
             self.add_command(Opcode.POP)
 
-    def translate_action(self, term, action, fun_name):
-        if isinstance(action, list):
-            self.translate_term(action, fun_name)
+    def is_function(self, name) -> bool:
+        return name in self.functions or name in self.externs
+
+    def translate_tail_term(self, term, fun_name):
+        if term[0] == fun_name:
+            yield self.translate_tail_call(term, fun_name)
+        elif term[0] == "if":
+            yield self.translate_if(term, fun_name, tail=True)
+        else:
+            yield self.translate_term(term, fun_name)
+
+    def translate_tail_call(self, term, fun_name):
+        """Self-call whose result is returned: new arguments replace the current ones, locals are
+        popped and control jumps to the function entry, so the stack doesn't grow."""
+        variables = self.fun_variables[fun_name]
+        locals_count = variables.index("")
+        args_names = list(reversed(variables[locals_count + 1 :]))
+        args = term[1:]
+
+        if len(args) != len(args_names):
+            yield self.translate_fun_call(term, fun_name)
+            return
+
+        # storing an argument is safe unless a later argument still reads its old value
+        args_atoms = [term_atoms(arg) for arg in args]
+        in_place = all(args_names[i] not in args_atoms[j] for i in range(len(args)) for j in range(i + 1, len(args)))
+
+        if in_place:
+            for i, arg in enumerate(args):
+                slot = len(variables) - 1 - i
+                increment_opcode = self.get_increment_opcode(args_names[i], arg)
+
+                if increment_opcode is not None:
+                    self.add_command(increment_opcode, AddressingType.SP_INDIRECT, slot)
+                elif arg != args_names[i]:
+                    yield self.translate_argument(term, arg, fun_name)
+                    self.add_command(Opcode.SAVE, AddressingType.SP_INDIRECT, slot)
+        else:
+            for arg in args:
+                yield self.translate_argument(term, arg, fun_name)
+                self.add_command(Opcode.PUSH)
+                variables.insert(0, TEMPORARY_SLOT)
+
+            for i in range(len(args)):
+                self.add_command(Opcode.LOAD, AddressingType.SP_INDIRECT, len(args) - 1 - i)
+                self.add_command(Opcode.SAVE, AddressingType.SP_INDIRECT, len(variables) - 1 - i)
+
+            del variables[: len(args)]
+            locals_count += len(args)
+
+        for _ in range(locals_count):
+            self.add_command(Opcode.POP)
+
+        self.add_command(Opcode.JMP, AddressingType.DIRECT, self.functions[fun_name])
+
+    def translate_action(self, term, action, fun_name, tail: bool = False):
+        if isinstance(action, list) and tail:
+            yield self.translate_tail_term(action, fun_name)
+
+        elif isinstance(action, list):
+            yield self.translate_term(action, fun_name)
 
         elif re.match(r"\d+", str(action)):
             self.operation_with_num_literal(term, Opcode.LOAD, int(action))
 
         elif re.match(r"'.*\n*'", str(action)):
-            string_addr = self.get_string_literal_addr(str(action)[1:-1])
-            self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, string_addr)
+            self.add_address_load(self.get_string_literal_addr(str(action)[1:-1]))
 
         elif str(action) in boolean_literal():
             self.operation_with_bool_literal(Opcode.LOAD, action)
@@ -167,52 +286,121 @@ class Translator:
         else:
             self.operation_with_var(term, Opcode.LOAD, action, fun_name)
 
-    def translate_if(self, term, fun_name):
+    def translate_if(self, term, fun_name, tail: bool = False):
         condition = term[1]
         if_true = term[2]
         if_false = term[3] if len(term) == 4 else None
 
-        if isinstance(condition, list):
-            self.translate_term(condition, fun_name)
+        # a false comparison leaves its operand in AC, while `if` without else must return 0
+        if if_false is None and isinstance(condition, list) and condition[0] in [*comparison_symbols(), "&"]:
+            if_false = "0"
 
-        elif str(condition) in boolean_literal():
-            self.operation_with_bool_literal(Opcode.LOAD, condition)
-        else:
-            self.operation_with_var(term, Opcode.LOAD, condition, fun_name)
-
-        jz_command_pc = self.pc
-        self.add_command()
+        else_jumps = yield self.translate_condition_jump(term, condition, fun_name, jump_if=False)
 
-        self.translate_action(term, if_true, fun_name)
+        yield self.translate_action(term, if_true, fun_name, tail)
 
         if if_false is None:
-            self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc, jz_command_pc)
+            self.patch_jumps(else_jumps, self.pc)
             return
 
         jmp_command_pc = self.pc
         self.add_command()
-        self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc, jz_command_pc)
+        self.patch_jumps(else_jumps, self.pc)
 
-        self.translate_action(term, if_false, fun_name)
+        yield self.translate_action(term, if_false, fun_name, tail)
         self.add_command(Opcode.JMP, AddressingType.DIRECT, self.pc, jmp_command_pc)
 
-    def translate_while(self, term, fun_name):
-        condition = term[1]
-        actions = term[2:]
+    def is_var_in_acc(self, term, var_name, fun_name, start_pc: int) -> bool:
+        if isinstance(var_name, list) or re.match(r"\d+", str(var_name)) or not self.code_memory:
+            return False
+
+        if self.code_memory[-1] == "":
+            return False
+
+        opcode, addressing_type, operand = command_from_hex(self.code_memory[-1])
+        if opcode not in {Opcode.SAVE, Opcode.INC, Opcode.DEC}:
+            return False
+        if (addressing_type, operand) != self.get_var_operand(term, var_name, fun_name):
+            return False
+
+        for command in self.code_memory[start_pc:]:
+            if command == "":
+                continue
+            opcode, _, operand = command_from_hex(command)
+            if opcode in {Opcode.JMP, Opcode.JZ, Opcode.JNZ} and operand == self.pc:
+                return False
 
-        condition_pc = self.pc
+        return True
+
+    def translate_condition(self, term, condition, fun_name, start_pc: int | None = None) -> Generator[Task, Any, bool]:
+        if isinstance(condition, list) and condition[0] in comparison_symbols():
+            arg1_in_acc = start_pc is not None and self.is_var_in_acc(condition, condition[1], fun_name, start_pc)
+            yield self.translate_comparison_operands(condition, fun_name, arg1_in_acc)
+            return condition[0] == "="
 
         if isinstance(condition, list):
-            self.translate_term(condition, fun_name)
+            yield self.translate_term(condition, fun_name)
+
+        elif str(condition) in boolean_literal():
+            self.operation_with_bool_literal(Opcode.LOAD, condition)
         else:
             self.operation_with_var(term, Opcode.LOAD, condition, fun_name)
 
-        jz_command_pc = self.pc
+        return False
+
+    def translate_condition_jump(
+        self,
+        term,
+        condition,
+        fun_name,
+        jump_if: bool,
+        start_pc: int | None = None,
+        jumps: list[tuple[int, Opcode]] | None = None,
+    ) -> Generator[Task, Any, list[tuple[int, Opcode]]]:
+        """Emits placeholders of jumps taken when `condition` equals `jump_if`, to be patched by `patch_jumps`.
+        They are appended to `jumps`, or to a new list, which is returned; a chain of `&` shares one list."""
+        if jumps is None:
+            jumps = []
+
+        if isinstance(condition, list) and condition[0] == "&":
+            return (yield self.translate_ampersand_jump(term, condition, fun_name, jump_if, start_pc, jumps))
+
+        zero_means_true = yield self.translate_condition(term, condition, fun_name, start_pc)
+        jump_opcode = Opcode.JZ if zero_means_true == jump_if else Opcode.JNZ
+
+        jumps.append((self.pc, jump_opcode))
         self.add_command()
 
+        return jumps
+
+    def translate_ampersand_jump(
+        self, term, condition, fun_name, jump_if: bool, start_pc: int | None, jumps: list[tuple[int, Opcode]]
+    ):
+        if not jump_if:
+            yield self.translate_condition_jump(term, condition[1], fun_name, False, start_pc, jumps)
+            return (yield self.translate_condition_jump(term, condition[2], fun_name, False, None, jumps))
+
+        false_jumps = yield self.translate_condition_jump(term, condition[1], fun_name, False, start_pc)
+        yield self.translate_condition_jump(term, condition[2], fun_name, True, None, jumps)
+        self.patch_jumps(false_jumps, self.pc)
+
+        return jumps
+
+    def patch_jumps(self, jumps: list[tuple[int, Opcode]], target: int) -> None:
+        for jump_command_pc, jump_opcode in jumps:
+            self.add_command(jump_opcode, AddressingType.DIRECT, target, jump_command_pc)
+
+    def translate_while(self, term, fun_name):
+        condition = term[1]
+        actions = term[2:]
+
+        exit_jumps = yield self.translate_condition_jump(term, condition, fun_name, jump_if=False)
+
+        body_pc = self.pc
+
         for act in actions:
             if isinstance(act, list):
-                self.translate_term(act, fun_name)
+                yield self.translate_term(act, fun_name)
 
             elif re.match(r"\d+", str(act)):
                 self.operation_with_num_literal(term, Opcode.LOAD, int(act))
@@ -223,11 +411,12 @@ class Translator:
             else:
                 self.operation_with_var(term, Opcode.LOAD, act, fun_name)
 
-        self.add_command(Opcode.JMP, AddressingType.DIRECT, condition_pc)
-        self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc, jz_command_pc)
+        loop_jumps = yield self.translate_condition_jump(term, condition, fun_name, True, body_pc)
+        self.patch_jumps(loop_jumps, body_pc)
+        self.patch_jumps(exit_jumps, self.pc)
 
     def get_var_address(self, var_name, fun_name):
-        var_addr = self.variables.get(var_name)
+        var_addr = self.variables.get(var_name, self.externs.get(var_name))
 
         if var_addr is None and fun_name is not None:
             try:
@@ -246,12 +435,30 @@ class Translator:
 
         return var_addr, False
 
+    def get_increment_opcode(self, var_name, var_value) -> Opcode | None:
+        if not isinstance(var_value, list) or len(var_value) != 3:
+            return None
+
+        if var_value[0] == "+" and var_value[1:] in ([var_name, "1"], ["1", var_name]):
+            return Opcode.INC
+
+        if var_value[0] == "-" and var_value[1:] == [var_name, "1"]:
+            return Opcode.DEC
+
+        return None
+
     def translate_set(self, term, fun_name):
         var_name = term[1]
         var_value = term[2]
 
+        increment_opcode = self.get_increment_opcode(var_name, var_value)
+
+        if increment_opcode is not None:
+            self.operation_with_var(term, increment_opcode, var_name, fun_name)
+            return
+
         if isinstance(var_value, list):
-            self.translate_term(var_value, fun_name)
+            yield self.translate_term(var_value, fun_name)
 
         elif re.match(r"\d+", str(var_value)):
             self.operation_with_num_literal(term, Opcode.LOAD, int(var_value))
@@ -261,28 +468,20 @@ class Translator:
         else:
             self.operation_with_var(term, Opcode.LOAD, var_value, fun_name)
 
-        var_addr, is_pushed = self.get_var_address(var_name, fun_name)
+        _, is_pushed = self.get_var_address(var_name, fun_name)
 
-        if fun_name is not None:
-            if not is_pushed:
-                self.add_command(Opcode.SAVE, AddressingType.SP_INDIRECT, var_addr)
-        else:
-            self.add_command(Opcode.SAVE, AddressingType.DIRECT, var_addr)
+        if not is_pushed:
+            self.operation_with_var(term, Opcode.SAVE, var_name, fun_name)
 
     def translate_set_char(self, term, fun_name):
         string_name = term[1]
         pos = term[2]
         char = term[3]
 
-        string_info = self.string_arrays.get(string_name)
-
-        if string_info is None:
-            raise TermError(term, "No such string name")
-
-        string_addr = string_info[0]
+        string_addr = self.get_string_addr(term, string_name)
         new_char_addr = self.add_data(0)
 
-        self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, string_addr)
+        self.add_address_load(string_addr)
 
         if re.match(r"\d+", str(pos)):
             self.operation_with_num_literal(term, Opcode.ADD, int(pos))
@@ -292,7 +491,7 @@ class Translator:
         self.add_command(Opcode.SAVE, AddressingType.DIRECT, new_char_addr)
 
         if isinstance(char, list):
-            self.translate_term(char, fun_name)
+            yield self.translate_term(char, fun_name)
         elif re.match(r"\d+", str(char)):
             self.operation_with_num_literal(term, Opcode.LOAD, int(char))
         else:
@@ -300,53 +499,47 @@ class Translator:
 
         self.add_command(Opcode.SAVE, AddressingType.INDIRECT, new_char_addr)
 
-    def translate_print_string(self, term):
-        string = term[1]
-
-        string_addr_addr = self.add_data(0)
-
-        if re.match(r"'.*\n*'", str(string)):
-            string_addr = self.get_string_literal_addr(string[1:-1])
-            self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, string_addr)
+    def get_string_addr(self, term, string_name) -> int:
+        string_info = self.string_arrays.get(string_name)
 
-        elif isinstance(string, list):
-            self.translate_term(string)
+        if string_info is not None:
+            return string_info[0]
+        if string_name in self.externs:
+            return self.externs[string_name]
 
-        else:
-            string_info = self.string_arrays.get(string)
+        raise TermError(term, "No such string name")
 
-            if string_info is None:
-                raise TermError(term, "No such string name")
-
-            string_addr = string_info[0]
-            self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, string_addr)
+    def translate_print_string(self, term):
+        string = term[1]
 
-        self.add_command(Opcode.SAVE, AddressingType.DIRECT, string_addr_addr)
+        if isinstance(string, list):
+            yield self.translate_term(string)
 
-        self.add_command(Opcode.LOAD, AddressingType.INDIRECT, string_addr_addr)
-        self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc + 6)
-        self.add_command(Opcode.PRINT)
+        elif re.match(r"'.*\n*'", string):
+            self.add_address_load(self.get_string_literal_addr(string[1:-1]))
 
-        self.add_command(Opcode.LOAD, AddressingType.DIRECT, string_addr_addr)
-        self.add_command(Opcode.ADD, AddressingType.OPERAND_LOAD, 1)
-        self.add_command(Opcode.SAVE, AddressingType.DIRECT, string_addr_addr)
+        else:
+            self.add_address_load(self.get_string_addr(term, string))
 
-        self.add_command(Opcode.JMP, AddressingType.DIRECT, self.pc - 6)
+        self.add_command(Opcode.PRINTS)
 
     def translate_print_int(self, term, fun_name):
         arg = term[1]
 
-        array_addr = self.string_arrays.get("print-int")
+        array_info = self.string_arrays.get("print-int")
 
-        if array_addr is None:
+        # digits are stored backwards from array_addr + 9, array_addr + 10 stays 0 as the terminator
+        if array_info is None:
             array_addr = self.add_data(0, 11)
             self.string_arrays["print-int"] = (array_addr, 11)
-            self.add_data(array_addr + 1)
+            self.data_relocations.append(self.add_data(array_addr + 9))
+        else:
+            array_addr = array_info[0]
 
         array_start = array_addr + 11
 
         if isinstance(arg, list):
-            self.translate_term(arg)
+            yield self.translate_term(arg)
         elif re.match(r"\d+", str(arg)):
             self.operation_with_num_literal(term, Opcode.LOAD, arg)
         else:
@@ -359,41 +552,27 @@ class Translator:
         self.add_command(Opcode.LOAD, AddressingType.SP_INDIRECT, 0)
         self.add_command(Opcode.MOD, AddressingType.OPERAND_LOAD, 10)
         self.add_command(Opcode.ADD, AddressingType.OPERAND_LOAD, ord("0"))
-        self.add_command(Opcode.SAVE, AddressingType.INDIRECT, array_start)
+        self.add_command(Opcode.SAVE, AddressingType.POST_DECREMENT, array_start)
 
         self.add_command(Opcode.LOAD, AddressingType.SP_INDIRECT, 0)
         self.add_command(Opcode.DIV, AddressingType.OPERAND_LOAD, 10)
-        self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc + 6)
+        self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc + 3)
         self.add_command(Opcode.SAVE, AddressingType.SP_INDIRECT, 0)
 
-        self.add_command(Opcode.LOAD, AddressingType.DIRECT, array_start)
-        self.add_command(Opcode.ADD, AddressingType.OPERAND_LOAD, 1)
-        self.add_command(Opcode.SAVE, AddressingType.DIRECT, array_start)
-
         self.add_command(Opcode.JMP, AddressingType.DIRECT, start_pc)
         self.add_command(Opcode.POP)
 
-        start_pc = self.pc
-
-        self.add_command(Opcode.LOAD, AddressingType.INDIRECT, array_start)
-        self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc + 6)
-        self.add_command(Opcode.PRINT)
+        self.add_command(Opcode.INC, AddressingType.DIRECT, array_start)
+        self.add_command(Opcode.PRINTS)
 
-        self.add_command(Opcode.LOAD, AddressingType.DIRECT, array_start)
-        self.add_command(Opcode.SUB, AddressingType.OPERAND_LOAD, 1)
-        self.add_command(Opcode.SAVE, AddressingType.DIRECT, array_start)
-
-        self.add_command(Opcode.JMP, AddressingType.DIRECT, start_pc)
-
-        self.add_command(Opcode.LOAD, AddressingType.DIRECT, array_start)
-        self.add_command(Opcode.ADD, AddressingType.OPERAND_LOAD, 1)
+        self.add_address_load(array_addr + 9)
         self.add_command(Opcode.SAVE, AddressingType.DIRECT, array_start)
 
     def translate_print_char(self, term, fun_name):
         arg = term[1]
 
         if isinstance(arg, list):
-            self.translate_term(arg, fun_name)
+            yield self.translate_term(arg, fun_name)
 
         elif re.match(r"\d+", str(arg)):
             self.operation_with_num_literal(term, Opcode.LOAD, arg)
@@ -416,26 +595,44 @@ class Translator:
 
         self.string_arrays[string_name] = (string_addr, string_size)
 
-    def translate_comparison_symbol(self, term, fun_name):
+    def translate_extern(self, term):
+        """Declares functions, global variables and strings defined by other modules, their
+        addresses are filled in by the linker."""
+        for name in term[1:]:
+            if isinstance(name, list) or name in self.variables or name in self.functions:
+                raise TermError(term, "Extern name must be a new symbol")
+
+            if name not in self.externs:
+                operand = EXTERN_OPERAND - len(self.externs)
+                self.externs[name] = operand
+                self.extern_names[operand] = name
+
+    def translate_comparison_operands(self, term, fun_name, arg1_in_acc: bool = False):
         arg1 = term[1]
         arg2 = term[2]
 
-        if re.match(r"\d+", str(arg1)):
-            self.operation_with_num_literal(term, Opcode.LOAD, int(arg1))
+        if arg1_in_acc:
+            pass
 
         elif isinstance(arg1, list):
-            self.translate_term(arg1, fun_name)
+            yield self.translate_term(arg1, fun_name)
+
+        elif re.match(r"\d+", arg1):
+            self.operation_with_num_literal(term, Opcode.LOAD, int(arg1))
         else:
             self.operation_with_var(term, Opcode.LOAD, arg1, fun_name)
 
-        if re.match(r"\d+", str(arg2)):
+        if not isinstance(arg2, list) and re.match(r"\d+", arg2):
             self.operation_with_num_literal(term, Opcode.CMP, int(arg2))
 
         elif isinstance(arg1, list):
-            self.translate_term(arg2, fun_name)
+            yield self.translate_term(arg2, fun_name)
         else:
             self.operation_with_var(term, Opcode.CMP, arg2, fun_name)
 
+    def translate_comparison_symbol(self, term, fun_name):
+        yield self.translate_comparison_operands(term, fun_name)
+
         arg_value = 0 if term[0] == "=" else 1
         opposite_arg_value = 1 if term[0] == "=" else 0
 
@@ -460,65 +657,51 @@ class Translator:
             self.operation_with_var(term, opcode, arg2, fun_name)
 
     def translate_ampersand(self, term, fun_name):
-        cond1 = term[1]
-        cond2 = term[2]
-
-        if isinstance(cond1, list):
-            self.translate_term(cond1, fun_name)
-        else:
-            self.operation_with_var(term, Opcode.LOAD, cond1, fun_name)
-
-        self.add_command(Opcode.PUSH)
-
-        if isinstance(cond2, list):
-            self.translate_term(cond2, fun_name)
-        else:
-            self.operation_with_var(term, Opcode.LOAD, cond2, fun_name)
-
-        self.add_command(Opcode.CMP, AddressingType.SP_INDIRECT, 0)
-        self.add_command(Opcode.JZ, AddressingType.DIRECT, self.pc + 3)
-        self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, 0)
-        self.add_command(Opcode.JMP, AddressingType.DIRECT, self.pc + 2)
+        """`(& a b)` is 1 if both operands are non-zero and 0 otherwise, `b` isn't evaluated if `a` is
+        zero, as in conditions, see `translate_ampersand_jump`."""
+        false_jumps = yield self.translate_ampersand_jump(term, term, fun_name, False, None, [])
         self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, 1)
-        self.add_command(Opcode.POP)
+        self.add_command(Opcode.JMP, AddressingType.DIRECT, self.pc + 2)
+        self.patch_jumps(false_jumps, self.pc)
+        self.add_command(Opcode.LOAD, AddressingType.OPERAND_LOAD, 0)
 
     def translate_term(self, term, fun_name: str | None = None):
         if term[0] == "fun":
             if fun_name is None:
-                self.translate_fun(term)
+                yield self.translate_fun(term)
                 return
             raise TermError(term, "You can't define function inside other function")
 
-        if term[0] in self.functions.keys():
-            self.translate_fun_call(term, fun_name)
+        if self.is_function(term[0]):
+            yield self.translate_fun_call(term, fun_name)
             return
 
         if term[0] == "if":
-            self.translate_if(term, fun_name)
+            yield self.translate_if(term, fun_name)
             return
 
         if term[0] == "while":
-            self.translate_while(term, fun_name)
+            yield self.translate_while(term, fun_name)
             return
 
         if term[0] == "set":
-            self.translate_set(term, fun_name)
+            yield self.translate_set(term, fun_name)
             return
 
         if term[0] == "set_char":
-            self.translate_set_char(term, fun_name)
+            yield self.translate_set_char(term, fun_name)
             return
 
         if term[0] == "print_string":
-            self.translate_print_string(term)
+            yield self.translate_print_string(term)
             return
 
         if term[0] == "print_char":
-            self.translate_print_char(term, fun_name)
+            yield self.translate_print_char(term, fun_name)
             return
 
         if term[0] == "print_int":
-            self.translate_print_int(term, fun_name)
+            yield self.translate_print_int(term, fun_name)
             return
 
         if term[0] == "read_char":
@@ -530,11 +713,11 @@ class Translator:
             return
 
         if term[0] in comparison_symbols():
-            self.translate_comparison_symbol(term, fun_name)
+            yield self.translate_comparison_symbol(term, fun_name)
             return
 
         if term[0] == "&":
-            self.translate_ampersand(term, fun_name)
+            yield self.translate_ampersand(term, fun_name)
             return
 
         if term[0] in arithmetic_symbols():
@@ -543,16 +726,42 @@ class Translator:
 
         raise TermError(term, "Invalid keyword")
 
-    def translate(self, terms):
+    def run(self, task: Task):
+        """Runs a translation step with the steps it yields on an explicit stack instead of the Python
+        call stack, so the nesting depth of a program is limited only by memory."""
+        tasks = [task]
+        result = None
+
+        while tasks:
+            try:
+                subtask = tasks[-1].send(result)
+            except StopIteration as stop:
+                tasks.pop()
+                result = stop.value
+            else:
+                tasks.append(subtask)
+                result = None
+
+        return result
+
+    def compile(self, terms) -> ObjectModule:
+        """Translates the terms of a module into a relocatable object, see `linker.link`."""
         for term in terms:
-            self.translate_term(term)
+            if term[0] == "extern":
+                self.translate_extern(term)
+            else:
+                self.run(self.translate_term(term))
 
-        self.data_memory[0] = command_to_hex(Opcode.JMP, AddressingType.DIRECT, len(self.data_memory))
+        symbols = {name: (FUNCTION, addr) for name, addr in self.functions.items()}
+        symbols.update({name: (VARIABLE, addr) for name, addr in self.variables.items()})
+        symbols.update({name: (ARRAY, addr) for name, (addr, _) in self.string_arrays.items() if name != "print-int"})
 
-        for i in range(len(self.code_memory)):
-            command = command_from_hex(self.code_memory[i])
-            if command[0] == Opcode.JMP or command[0] == Opcode.JZ or command[0] == Opcode.CALL:
-                self.code_memory[i] = command_to_hex(command[0], command[1], command[2] + len(self.data_memory))
+        relocations = [(CODE, index, kind, symbol) for index, (kind, symbol) in sorted(self.code_relocations.items())]
+        relocations.extend((DATA, index, DATA, None) for index in self.data_relocations)
 
-        self.add_command(Opcode.HLT)
-        return self.data_memory + self.code_memory
+        return ObjectModule(list(self.code_memory), self.data_memory[1:], symbols, relocations)
+
+    def translate(self, terms):
+        memory, self.relocations = link([self.compile(terms)])
+        self.data_memory[0] = memory[0]
+        return memory
@@ -0,0 +1,58 @@
+import asyncio
+import os
+from pathlib import Path
+
+import pytest
+from src.machine import machine
+from src.translator import main
+
+EXAMPLES = os.path.join(Path(__file__).parent, "..", "lisp-examples")
+
+
+class OutputWriter:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(data.decode("utf-8"))
+
+    async def drain(self):
+        pass
+
+
+async def run_session(memory, engine, lines, writer=None):
+    reader = asyncio.StreamReader()
+    simulation = asyncio.create_task(
+        machine.async_simulation(list(memory), reader, 100000, engine, writer, slice_size=7)
+    )
+
+    for line in lines:
+        await asyncio.sleep(0.001)
+        reader.feed_data(line.encode("utf-8"))
+    reader.feed_eof()
+
+    return await simulation
+
+
+@pytest.mark.parametrize("engine", machine.ENGINES)
+def test_async_simulation_waits_for_input(engine):
+    with open(os.path.join(EXAMPLES, "hello-name"), encoding="utf-8") as f:
+        memory, _ = main.translate(f.read())
+    writer = OutputWriter()
+
+    result = asyncio.run(run_session(memory, engine, ["Al", "ïce"], writer))
+
+    assert result == machine.simulation(list(memory), [*"Alïce", "\0"], limit=100000)
+    assert writer.chunks[0] == "What is your name?"
+    assert "".join(writer.chunks) == result[0]
+
+
+def test_concurrent_sessions():
+    with open(os.path.join(EXAMPLES, "cat"), encoding="utf-8") as f:
+        memory, _ = main.translate(f.read())
+
+    async def run_sessions():
+        return await asyncio.gather(*(run_session(memory, "jit", [str(i), "!"]) for i in range(1000)))
+
+    for i, (output, _, _) in enumerate(asyncio.run(run_sessions())):
+        assert output == f"{i}!"
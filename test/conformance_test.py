@@ -0,0 +1,23 @@
+from src import conformance
+
+
+def test_configurations_agree():
+    programs = {**conformance.golden_programs(), **conformance.random_programs(20)}
+
+    report = conformance.check(programs, workers=2)
+
+    assert report["mismatches"] == []
+    assert report["throughput"].keys() == set(conformance.available_configs())
+
+
+def test_differences():
+    result = ("ab", 10, 20, (1, 2), None)
+
+    assert conformance.differences(result, result) == []
+    assert conformance.differences(result, ("ab", 10, 21, None, None)) == ["ticks"]
+    assert conformance.differences(result, ("a", 10, 20, (1, 3), None)) == ["output", "memory"]
+
+
+def test_random_programs_are_reproducible():
+    assert conformance.random_programs(3, seed=7) == conformance.random_programs(3, seed=7)
+    assert conformance.random_programs(1, seed=7) != conformance.random_programs(1, seed=8)
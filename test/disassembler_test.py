@@ -0,0 +1,46 @@
+import io
+import os
+from pathlib import Path
+
+from src.disassembler import Disassembler, write_lines
+from src.translator import main
+
+EXAMPLES = os.path.join(Path(__file__).parent, "..", "lisp-examples")
+
+
+def test_listing_is_streamed_in_chunks():
+    with open(os.path.join(EXAMPLES, "prob1"), encoding="utf-8") as f:
+        _, debug = main.translate(f.read())
+    lines = list(debug)
+
+    for chunk_size in (1, 7, len(lines), len(lines) + 1):
+        file = io.StringIO()
+        write_lines(iter(lines), file, chunk_size)
+        assert file.getvalue() == "\n".join(lines)
+
+
+def test_labels_and_ranges():
+    with open(os.path.join(EXAMPLES, "tail-sum"), encoding="utf-8") as f:
+        memory, _ = main.translate(f.read())
+    disassembler = Disassembler(memory)
+
+    assert disassembler.line(0) == "     0  D000000D  jmp start"
+    assert disassembler.line(12) == "    12  0000000A  .word 10"
+    assert list(disassembler.render(13, 15)) == [
+        "start:",
+        "    13  D0000021  jmp L33",
+        "fun_14:",
+        "    14  43000002  load &2",
+    ]
+    assert "    37  8000000E  call fun_14" in disassembler.render(37, 38)
+    assert list(disassembler.render(len(memory) - 1, len(memory) + 10)) == [f"{len(memory) - 1:6}  F0000000  halt"]
+
+
+def test_only_direct_jumps_are_labelled():
+    # word 0 jumps to 2, then a jump through the data word 1 and a call through a stack slot
+    memory = ["D0000002", "00000003", "F0000000", "D1000001", "83000000", "F0000000"]
+    disassembler = Disassembler(memory)
+
+    assert disassembler.labels == {2: "start"}
+    assert disassembler.line(3) == "     3  D1000001  jmp $1"
+    assert disassembler.line(4) == "     4  83000000  call &0"
@@ -2,28 +2,62 @@ import contextlib
 import io
 import logging
 import os
+import pickle
 import tempfile
 
 import pytest
-from src.machine import machine
+from src.machine import aot, machine
 from src.translator import main
 
+ENGINES = ["closure", "jit", "aot", "batch"]
+
+
+def write_golden_files(golden, tmpdirname):
+    """Writes the source and the input of a golden test, returns their paths."""
+    source = os.path.join(tmpdirname, "source")
+    input_stream = os.path.join(tmpdirname, "input")
+
+    with open(source, "w", encoding="utf-8") as file:
+        file.write(golden["source"])
+    with open(input_stream, "w", encoding="utf-8") as file:
+        file.write(golden["input"])
+
+    return source, input_stream
+
+
+def run_engine(engine, target_bin, input_stream, tmpdirname):
+    """Runs a translated image in `engine`, printing what `machine.main` prints."""
+    if engine not in ("aot", "batch"):
+        machine.main(target_bin, input_stream, engine=engine)
+        return
+
+    with open(target_bin, "rb") as f:
+        image = pickle.load(f)
+
+    if engine == "aot":
+        target_module = os.path.join(tmpdirname, "target_module.py")
+        aot.compile_image(image, target_module)
+        aot.load_module(target_module).main(input_stream)
+        return
+
+    from src.machine import batch
+
+    with open(input_stream, encoding="utf-8") as file:
+        input_tokens = [*file.read(), "\0"]
+    [(output, instr_counter, ticks)] = batch.batch_simulation(image, [input_tokens], limit=1000)
+    print(output)
+    print(f"instr_counter: {instr_counter}, ticks: {ticks}")
+
 
 @pytest.mark.golden_test("../golden/*.yml")
 def test_whole_by_golden(golden, caplog):
     caplog.set_level(logging.DEBUG)
 
     with tempfile.TemporaryDirectory() as tmpdirname:
-        source = os.path.join(tmpdirname, "source")
-        input_stream = os.path.join(tmpdirname, "input")
+        source, input_stream = write_golden_files(golden, tmpdirname)
         target = os.path.join(tmpdirname, "target")
         target_bin = os.path.join(tmpdirname, "target_bin")
 
-        with open(source, "w", encoding="utf-8") as file:
-            file.write(golden["source"])
-        with open(input_stream, "w", encoding="utf-8") as file:
-            file.write(golden["input"])
-
         with contextlib.redirect_stdout(io.StringIO()) as stdout:
             main.main(source, target, target_bin)
             print("============================================================")
@@ -35,3 +69,21 @@ def test_whole_by_golden(golden, caplog):
         assert code == golden.out["code"]
         assert stdout.getvalue() == golden.out["output"]
         assert caplog.text == golden.out["log"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.golden_test("../golden/*.yml")
+def test_engine_by_golden(golden, engine):
+    if engine == "batch":
+        pytest.importorskip("numpy")
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        source, input_stream = write_golden_files(golden, tmpdirname)
+        target_bin = os.path.join(tmpdirname, "target_bin")
+
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            main.main(source, None, target_bin)
+            print("============================================================")
+            run_engine(engine, target_bin, input_stream, tmpdirname)
+
+        assert stdout.getvalue() == golden.out["output"]
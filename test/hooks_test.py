@@ -0,0 +1,51 @@
+from src.machine import machine
+from src.machine.control_unit import ControlUnit
+from src.machine.data_path import DataPath
+from src.machine.hooks import Hooks
+from src.translator import main
+
+SOURCE = "(fun twice (c) (print_char c) (print_char c))\n(set x (read_char))\n(twice x)\n(print_string 'ok')"
+
+
+def test_events():
+    memory, _ = main.translate(SOURCE)
+    hooks = Hooks()
+    events = []
+    for event in ("io", "call", "return"):
+        hooks.on(event, lambda *args, event=event: events.append((event, *args)))
+    hooks.on("fetch", lambda ip, word: events.append(("fetch", ip)))
+    hooks.on("write", lambda addr, value: events.append(("write", addr, value)))
+
+    output, instr_counter, _ = machine.simulation(memory, ["z", "\0"], limit=1000, hooks=hooks)
+    x_addr = 1
+
+    assert output == "zzok"
+    # halt is fetched but not counted
+    assert len([event for event in events if event[0] == "fetch"]) == instr_counter + 1
+    assert ("write", x_addr, ord("z")) in events
+    assert [event for event in events if event[0] in ("io", "call", "return")] == [
+        ("io", "in", "z"),
+        ("call", 6, 16),
+        ("io", "out", "z"),
+        ("io", "out", "z"),
+        ("return", 16),
+        ("io", "out", "o"),
+        ("io", "out", "k"),
+    ]
+
+
+def test_only_used_events_are_wrapped():
+    memory, _ = main.translate(SOURCE)
+    data_path = DataPath(list(memory), [])
+    control_unit = ControlUnit(data_path)
+
+    Hooks().install(control_unit)
+    assert vars(control_unit).keys() == {"data_path", "_tick"}
+    assert "read" not in vars(data_path)
+
+    hooks = Hooks()
+    hooks.on("read", lambda addr, value: None)
+    hooks.install(control_unit)
+    assert "read" in vars(data_path)
+    assert "signal_wr" not in vars(data_path)
+    assert "decode_and_execute_instruction" not in vars(control_unit)
@@ -0,0 +1,66 @@
+import pytest
+from src.machine import machine
+from src.translator import build, main
+from src.translator.errors import LinkError
+from src.translator.lexer import Lexer
+from src.translator.linker import ObjectModule, link
+from src.translator.translator import Translator
+
+LIBRARY = "(alloc buf 3)\n(set base 48)\n(fun digit (n) (+ n base))\n(fun show (c) (print_char c))"
+PROGRAM = (
+    "(extern digit show base buf)\n(set x 5)\n(set d (digit x))\n(show d)\n"
+    "(set_char buf 0 d)\n(print_string buf)\n(set base 65)\n(show (digit 1))"
+)
+
+
+def compile_source(source):
+    return Translator().compile(Lexer().text_to_terms(source))
+
+
+def test_single_module_image():
+    first = "(set i 0)\n(while (!= i 3) (print_char (+ i 65)) (set i (+ i 1)))"
+    second = "(print_string 'hi')\n(set n 7)\n(print_int n)"
+
+    memory, _ = main.translate(first + "\n" + second)
+    linked, _ = link([compile_source(first), compile_source(second)])
+
+    assert linked == memory
+
+
+def test_extern_symbols():
+    library = ObjectModule.from_json(compile_source(LIBRARY).to_json())
+    memory, _ = link([library, compile_source(PROGRAM)])
+
+    assert machine.simulation(memory, [], limit=1000)[0] == "55B"
+
+
+@pytest.mark.parametrize(
+    ("modules", "error"),
+    [
+        ([PROGRAM], "Undefined symbol - digit"),
+        ([LIBRARY, LIBRARY, PROGRAM], "Symbol is defined in several modules - digit"),
+        (["(set digit 1)\n(fun show (c) c)\n(set base 0)\n(alloc buf 1)", PROGRAM], "Symbol is a variable - digit"),
+    ],
+)
+def test_link_errors(modules, error):
+    with pytest.raises(LinkError) as excinfo:
+        link([compile_source(source) for source in modules])
+
+    assert str(excinfo.value) == error
+
+
+def test_build_reuses_objects(tmp_path, capsys):
+    library, program, binary = tmp_path / "library", tmp_path / "program", tmp_path / "binary"
+    library.write_text(LIBRARY, encoding="utf-8")
+    program.write_text(PROGRAM, encoding="utf-8")
+
+    build.main(str(binary), str(library), str(program))
+    library_object = tmp_path / ("library" + build.OBJECT_SUFFIX)
+    modified = library_object.stat().st_mtime_ns
+
+    program.write_text(PROGRAM.replace("(set x 5)", "(set x 7)"), encoding="utf-8")
+    build.main(str(binary), str(library), str(program))
+
+    assert library_object.stat().st_mtime_ns == modified
+    assert ObjectModule.load(str(tmp_path / "program.o")).source_hash == build.source_hash(program.read_text())
+    assert "modules: 2" in capsys.readouterr().out
@@ -0,0 +1,37 @@
+import os
+from pathlib import Path
+
+from src.machine import machine
+from src.machine.metrics import Metrics
+from src.translator import main
+
+EXAMPLES = os.path.join(Path(__file__).parent, "..", "lisp-examples")
+
+
+def test_metrics_add_up():
+    with open(os.path.join(EXAMPLES, "hello-name"), encoding="utf-8") as f:
+        memory, _ = main.translate(f.read())
+    metrics = Metrics(memory)
+
+    output, instr_counter, ticks = machine.simulation(memory, [*"Alice", "\0"], limit=1000, metrics=metrics)
+    report = metrics.to_json()
+
+    for counters in (report["opcodes"], report["addressing"]):
+        assert sum(counter["count"] for counter in counters.values()) == instr_counter
+        assert sum(counter["ticks"] for counter in counters.values()) == ticks
+
+    assert report["io"] == {"input": 6, "output": len(output)}
+    assert report["memory"]["reads"]["code"] == instr_counter + 1
+    assert report["memory"]["writes"]["code"] == 0
+    # i and char are set once, then every char stores its address, itself, i and the next char
+    assert report["memory"]["writes"]["data"] == 2 + 4 * 5
+
+
+def test_stack_high_water_mark():
+    source = "(fun f (a b) (+ a b))\n(set x (f 1 2))\n(print_char (f x 62))"
+    memory, _ = main.translate(source)
+    metrics = Metrics(memory)
+
+    assert machine.simulation(memory, [], limit=1000, metrics=metrics)[0] == "A"
+    assert metrics.to_json()["stack"]["high_water_mark"] == 3
+    assert metrics.writes["stack"] == 6
@@ -0,0 +1,60 @@
+import logging
+
+from src.isa import Opcode
+from src.machine import control_unit, machine
+from src.machine.result_cache import ResultCache, result_key
+from src.translator import main
+
+SOURCE = "(print_char (read_char))"
+
+
+def test_cached_simulation(tmp_path, caplog):
+    memory, _ = main.translate(SOURCE)
+    cache = ResultCache(str(tmp_path))
+
+    expected = machine.simulation(memory, ["a", "\0"], limit=1000)
+    assert machine.cached_simulation(memory, ["a", "\0"], 1000, cache) == expected
+    assert machine.cached_simulation(memory, ["a", "\0"], 1000, cache) == expected
+    assert machine.cached_simulation(memory, ["b", "\0"], 1000, cache) != expected
+    assert cache.stats() == {"entries": 2, "bytes": cache.stats()["bytes"], "hits": 1, "misses": 2}
+
+    caplog.set_level(logging.WARNING)
+    machine.cached_simulation(memory, [], 1000, cache)
+    machine.cached_simulation(memory, [], 1000, cache)
+    assert caplog.text.count("Input buffer is empty!") == 2
+
+    cache.clear()
+    assert cache.stats() == {"entries": 0, "bytes": 0, "hits": 0, "misses": 0}
+
+
+def test_least_recently_used_eviction(tmp_path):
+    memory, _ = main.translate(SOURCE)
+    cache = ResultCache(str(tmp_path), max_bytes=0)
+
+    machine.cached_simulation(memory, ["a", "\0"], 1000, cache)
+    assert cache.stats()["entries"] == 0
+
+    cache.max_bytes = 1000
+    for char in "abcdefghijklmnopqrstuvwxyz":
+        machine.cached_simulation(memory, [char, "\0"], 1000, cache)
+    assert 0 < cache.stats()["bytes"] <= 1000
+
+
+def test_key_depends_on_tick_tables(monkeypatch):
+    memory, _ = main.translate(SOURCE)
+    key = result_key(memory, ["a", "\0"], 1000)
+
+    monkeypatch.setitem(control_unit.INSTRUCTION_TICKS, Opcode.PRINT, 2)
+    assert result_key(memory, ["a", "\0"], 1000) != key
+
+
+def test_counters_have_a_fixed_size(tmp_path):
+    memory, _ = main.translate(SOURCE)
+    cache = ResultCache(str(tmp_path))
+
+    for _ in range(50):
+        machine.cached_simulation(memory, ["a", "\0"], 1000, cache)
+
+    assert cache.stats()["hits"] == 49
+    assert sorted(path.name for path in tmp_path.iterdir() if not path.name.endswith(".pickle")) == ["counters"]
+    assert (tmp_path / "counters").stat().st_size == 16
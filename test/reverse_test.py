@@ -0,0 +1,74 @@
+import os
+import random
+from pathlib import Path
+
+from src.isa import Opcode, command_from_hex
+from src.machine.reverse import ReverseDebugger
+from src.translator import main
+
+EXAMPLES = os.path.join(Path(__file__).parent, "..", "lisp-examples")
+
+
+def state(debugger):
+    data_path = debugger.data_path
+    registers = (data_path.ip, data_path.ar, data_path.sp, data_path.alu, data_path.acc, debugger.control_unit._tick)
+    return registers, list(data_path.memory), list(data_path.output_buffer), list(data_path.input_buffer)
+
+
+def test_steps_back_to_every_state():
+    with open(os.path.join(EXAMPLES, "hello-name"), encoding="utf-8") as f:
+        memory, _ = main.translate(f.read())
+    # small checkpoint interval and history, so going back reloads checkpoints
+    debugger = ReverseDebugger(memory, [*"Ann", "\0"], checkpoint_interval=7, history=20)
+
+    states = [state(debugger)]
+    while debugger.step():
+        states.append(state(debugger))
+    assert debugger.halted
+    assert debugger.output().endswith("Ann!")
+
+    moves = random.Random(0)
+    for _ in range(100):
+        if moves.random() < 0.5:
+            debugger.step_back(moves.randint(1, 30))
+        else:
+            debugger.step(moves.randint(1, 30))
+        assert state(debugger) == states[debugger.position]
+
+    # checkpoints and records older than the history are gone, so it stops at the oldest checkpoint kept
+    debugger.step_back(len(states))
+    assert 0 < debugger.position == min(debugger.checkpoints)
+    assert state(debugger) == states[debugger.position]
+
+
+def test_back_to_write_and_reverse_continue():
+    source = "(set x 1)\n(set y 2)\n(set x 3)\n(set y 4)\n(print_char (+ x 62))"
+    memory, _ = main.translate(source)
+    x_addr = 1
+    debugger = ReverseDebugger(memory, [])
+    debugger.run()
+    assert debugger.output() == "A"
+
+    assert debugger.back_to_write(x_addr)
+    opcode, _, arg = command_from_hex(debugger.data_path.memory[debugger.data_path.ip])
+    assert (opcode, arg) == (Opcode.SAVE, x_addr)
+    assert int(debugger.data_path.memory[x_addr], 16) == 1
+
+    first_save = debugger.data_path.ip - 4
+    assert debugger.reverse_continue({first_save})
+    assert debugger.data_path.ip == first_save
+    assert not debugger.back_to_write(x_addr)
+    assert debugger.position == 0
+
+
+def test_checkpoints_are_bounded():
+    memory, _ = main.translate("(set i 0)\n(while (!= i 100000) (set i (+ i 1)))")
+    debugger = ReverseDebugger(memory, [], checkpoint_interval=100, history=1000)
+
+    for _ in range(100):
+        debugger.step(1000)
+        assert len(debugger.checkpoints) <= 1000 // 100 + 1
+
+    assert debugger.position == 100_000
+    assert debugger.step_back(5000) <= 1000 + 100
+    assert debugger.position == min(debugger.checkpoints)
@@ -0,0 +1,34 @@
+import os
+import tempfile
+import threading
+
+from src import server
+from src.machine import machine
+from src.translator import main
+
+
+def test_server_jobs():
+    source = "(print_char (read_char))"
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        socket_path = os.path.join(tmpdirname, "socket")
+        simulation_server = server.SimulationServer(socket_path, server.JobHandler)
+        threading.Thread(target=simulation_server.serve_forever, daemon=True).start()
+
+        client = server.Client(socket_path)
+        try:
+            result = client.run(source=source, input="a", engine="closure")
+            image_result = client.run(image=main.translate(source)[0], input="b")
+            error = client.run(source="(print_char x)")
+        finally:
+            client.close()
+            simulation_server.shutdown()
+            simulation_server.server_close()
+
+    memory, _ = main.translate(source)
+    assert [result["output"], result["instr_counter"], result["ticks"]] == list(
+        machine.simulation(memory, ["a", "\0"], limit=1000)
+    )
+    assert result["termination"] == machine.HALTED
+    assert image_result["output"] == "b"
+    assert error["error"].startswith("TermError")
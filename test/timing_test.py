@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+
+import pytest
+from src.machine import machine
+from src.machine.metrics import REGIONS, Metrics
+from src.machine.timing import Cache, TimingModel
+from src.translator import main
+
+EXAMPLES = os.path.join(Path(__file__).parent, "..", "lisp-examples")
+
+
+@pytest.mark.parametrize(
+    ("policy", "hits"), [("lru", [False, False, True, False, True]), ("fifo", [False, False, True, False, False])]
+)
+def test_replacement_policy(policy, hits):
+    # one set of two lines of two words
+    cache = Cache(size=4, associativity=2, line_size=2, policy=policy)
+
+    assert [cache.access(addr)[0] for addr in (0, 2, 1, 4, 0)] == hits
+
+
+def test_dirty_line_write_back():
+    cache = Cache(size=2, associativity=1, line_size=2)
+
+    assert cache.access(0, write=True) == (False, False)
+    assert cache.access(1) == (True, False)
+    assert cache.access(2) == (False, True)
+    assert cache.access(4) == (False, False)
+
+
+def test_stalls_add_up():
+    with open(os.path.join(EXAMPLES, "hello-name"), encoding="utf-8") as f:
+        memory, _ = main.translate(f.read())
+    _, _, base_ticks = machine.simulation(list(memory), [*"Alice", "\0"], limit=1000)
+
+    timing = TimingModel(memory, Cache(), Cache(size=16, line_size=2))
+    output, instr_counter, ticks = machine.simulation(list(memory), [*"Alice", "\0"], limit=1000, timing=timing)
+    report = timing.to_json()
+
+    assert output.endswith("Alice!")
+    assert ticks == base_ticks + timing.stall_ticks
+    instruction = report["instruction"]["code"]
+    assert instruction["hits"] + instruction["misses"] == instr_counter + 1
+    assert 0 < instruction["hit_rate"] < 1
+
+
+def test_uncached_accesses_go_to_memory():
+    with open(os.path.join(EXAMPLES, "hello-name"), encoding="utf-8") as f:
+        memory, _ = main.translate(f.read())
+    metrics = Metrics(memory)
+    machine.simulation(list(memory), [*"Bob", "\0"], limit=1000, metrics=metrics)
+
+    timing = TimingModel.from_json(memory, {"instruction_cache": None, "data_cache": None, "memory_latency": 3})
+    _, instr_counter, _ = machine.simulation(list(memory), [*"Bob", "\0"], limit=1000, timing=timing)
+
+    fetches = instr_counter + 1
+    assert sum(timing.hits["data"].values()) == 0
+    for region in REGIONS:
+        accesses = metrics.reads[region] + metrics.writes[region] - (fetches if region == "code" else 0)
+        assert timing.misses["data"][region] == accesses
+    assert timing.stall_ticks == 3 * (fetches + sum(timing.misses["data"].values()))
@@ -0,0 +1,39 @@
+import os
+import re
+import tempfile
+
+import pytest
+from src.machine import machine
+from src.machine.trace import RingTrace, StreamTrace, TraceRecorder, replay
+from src.translator import main
+
+
+@pytest.mark.golden_test("../golden/*.yml")
+def test_trace_replays_debug_log(golden):
+    memory, _ = main.translate(golden["source"])
+    input_tokens = [*golden["input"], "\0"]
+
+    expected = machine.simulation(list(memory), list(input_tokens), limit=1000)
+    log = re.findall(r"^DEBUG +\S+ +(.*)$", golden.out["log"], re.MULTILINE)
+
+    with tempfile.TemporaryDirectory() as tmpdirname:
+        stream_file = os.path.join(tmpdirname, "stream")
+        ring_file = os.path.join(tmpdirname, "ring")
+
+        stream_trace = StreamTrace(stream_file)
+        assert machine.simulation(list(memory), list(input_tokens), 1000, trace=stream_trace) == expected
+        stream_trace.close()
+
+        ring_trace = RingTrace(10)
+        machine.simulation(list(memory), list(input_tokens), 1000, trace=ring_trace)
+        ring_trace.dump(ring_file)
+
+        assert list(replay(stream_file)) == log
+        ring_replay = list(replay(ring_file))
+        assert ring_replay == list(replay(stream_file, max(expected[1] - 10, 0)))
+        assert ring_replay[-1] == log[-1]
+
+
+def test_recorder_is_abstract():
+    with pytest.raises(TypeError):
+        TraceRecorder()  # type: ignore[abstract]
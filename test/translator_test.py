@@ -0,0 +1,39 @@
+import sys
+
+from src.machine import machine
+from src.translator import main
+
+
+def test_deeply_nested_program():
+    depth = 5 * sys.getrecursionlimit()
+    source = "(set x 1)\n(print_int " + "(if (= x 1) " * depth + "7" + ")" * depth + ")"
+
+    memory, _ = main.translate(source)
+    output, _, _ = machine.simulation(memory, [], limit=10 * depth)
+
+    assert output == "7"
+
+
+def test_long_ampersand_chain():
+    # a quadratic translation of the chain takes about a minute here
+    depth = 100_000
+    condition = "(& (= x 1) " * depth + "(= x 1)" + ")" * depth
+    source = f"(set x 1)\n(set r 0)\n(if {condition} (set r 7) (set r 0))\n(print_int r)"
+
+    memory, _ = main.translate(source)
+    output, _, _ = machine.simulation(memory, [], limit=10 * depth)
+
+    assert output == "7"
+
+
+def test_ampersand_is_the_same_as_value_and_condition():
+    for x in range(2):
+        for y in range(2):
+            source = (
+                f"(set x {x})\n(set y {y})\n(set b (& x y))\n(print_int b)\n"
+                "(if (& x y) (set r 1) (set r 0))\n(print_int r)\n(set c (& (= x 1) (read_char)))\n(print_int c)"
+            )
+            memory, _ = main.translate(source)
+            output, _, _ = machine.simulation(memory, ["\0"], limit=1000)
+
+            assert output == f"{x & y}{x & y}0"